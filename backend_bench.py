@@ -0,0 +1,87 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import contextlib
+import csv
+from multiprocessing import get_context
+import os
+from pathlib import Path
+from timeit import default_timer
+
+from src.ilp import Block_ILP, Substring_ILP
+from src.ilp.backends import BACKENDS
+from src.utils import inter
+
+COLS = ('build_time', 'runtime', 'first_sol', 'first_time', 'last_sol',
+        'last_time', 'gap', 'best_bd')
+
+def _parse_args():
+    parser = argparse.ArgumentParser(
+        description='Compares the ILP backends on the SMCISP instances')
+    parser.add_argument('-b', '--backends', nargs='+', default=list(BACKENDS),
+                        choices=list(BACKENDS))
+    parser.add_argument('-l', '--limit', type=int, default=600,
+                        help='ILP time limit (in seconds)')
+    parser.add_argument('-n', '--cases', type=int, default=10,
+                        help='cases taken from each instance file')
+    parser.add_argument('--length', type=int,
+                        help='truncate both strings to this many genes')
+    parser.add_argument('-o', '--output', default='results/backends.csv')
+    args = parser.parse_args()
+    return args
+
+def solve(impl, s1, i1, s2, i2, balanced, limit, **kwargs):
+    # builds, formulates and solves one case quietly, returning the ILP and
+    # the formulation time, or None if the strings share no block
+    impl = Block_ILP if impl == 'cb' else Substring_ILP
+    with open(os.devnull, 'w') as f, contextlib.redirect_stdout(f):
+        ilp = impl(s1,s2,inter.signaled_compare,False,True,balanced,False,True,
+                   i1,i2,limit=limit,**kwargs)
+        if not (ilp.B if impl is Block_ILP else ilp.B1): return None
+        t = default_timer()
+        ilp.formulate()
+        build_time = default_timer() - t
+        ilp.optimize()
+    return ilp, build_time
+
+def _run(impl, backend, s1, i1, s2, i2, balanced, limit):
+    solved = solve(impl, s1, i1, s2, i2, balanced, limit, backend=backend)
+    if solved is None: return None
+    ilp, build_time = solved
+    w = ilp.watcher
+    return (build_time, ilp.model.runtime, w.first_sol, w.first_time,
+            w.last_sol, w.last_time, ilp.model.gap, ilp.model.bound)
+
+def cases(n, length):
+    for path in sorted(Path('instances').glob('*.in')):
+        lines = path.read_text().splitlines()
+        balanced = path.stem.split('-')[-1] == '1'
+        for i in range(min(n, len(lines) // 4)):
+            s1 = list(map(int, lines[i*4].split()))[:length]
+            i1 = list(map(int, lines[i*4 + 1].split()))[1:-1][:len(s1) - 1]
+            s2 = list(map(int, lines[i*4 + 2].split()))[:length]
+            i2 = list(map(int, lines[i*4 + 3].split()))[1:-1][:len(s2) - 1]
+            yield path.stem, i, (s1, i1, s2, i2, balanced)
+
+def main():
+    args = _parse_args()
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    # one fresh process per run: the solver libraries cannot share a process
+    # and this keeps one backend's memory from leaking into the next
+    pool = ProcessPoolExecutor(1, mp_context=get_context('spawn'),
+                               max_tasks_per_child=1)
+    with pool, open(args.output, 'w', newline='') as out:
+        writer = csv.writer(out)
+        writer.writerow(('instance', 'case', 'impl', 'backend') + COLS)
+        for name, i, case in cases(args.cases, args.length):
+            for impl in ('cb', 'cs'):
+                for backend in args.backends:
+                    row = pool.submit(_run, impl, backend, *case,
+                                      args.limit).result()
+                    if row is None: continue
+                    writer.writerow((name, i, impl, backend) + row)
+                    out.flush()
+                    print(name, i, impl, backend,
+                          *(f'{c}={v:.6g}' for c, v in zip(COLS, row)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import csv
+from multiprocessing import get_context
+import os
+
+from backend_bench import cases, solve
+from src.ilp.backends import BACKENDS
+
+COLS = ('vars', 'rows', 'nnz', 'build_time', 'runtime', 'last_sol', 'gap',
+        'best_bd')
+
+def _parse_args():
+    parser = argparse.ArgumentParser(
+        description='Compares the exclusive block encodings on the unbalanced '
+                    'SMCISP instances')
+    parser.add_argument('-b', '--backend', default='gurobi',
+                        choices=list(BACKENDS))
+    parser.add_argument('-l', '--limit', type=int, default=600,
+                        help='ILP time limit (in seconds)')
+    parser.add_argument('-n', '--cases', type=int, default=10,
+                        help='cases taken from each instance file')
+    parser.add_argument('--length', type=int,
+                        help='truncate both strings to this many genes')
+    parser.add_argument('-o', '--output', default='results/exclusive.csv')
+    args = parser.parse_args()
+    return args
+
+def _run(impl, exclusive, backend, s1, i1, s2, i2, balanced, limit):
+    solved = solve(impl, s1, i1, s2, i2, balanced, limit, backend=backend,
+                   exclusive=exclusive)
+    if solved is None: return None
+    ilp, build_time = solved
+    m = ilp.model
+    return (m.num_vars, sum(A.shape[0] for A, _, _ in m.rows),
+            sum(A.nnz for A, _, _ in m.rows), build_time, m.runtime,
+            ilp.watcher.last_sol, m.gap, m.bound)
+
+def main():
+    args = _parse_args()
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    pool = ProcessPoolExecutor(1, mp_context=get_context('spawn'),
+                               max_tasks_per_child=1)
+    with pool, open(args.output, 'w', newline='') as out:
+        writer = csv.writer(out)
+        writer.writerow(('instance', 'case', 'impl', 'exclusive') + COLS)
+        for name, i, case in cases(args.cases, args.length):
+            if case[-1]: continue
+            for impl in ('cb', 'cs'):
+                for exclusive in ('blocks', 'flow'):
+                    row = pool.submit(_run, impl, exclusive, args.backend,
+                                      *case, args.limit).result()
+                    if row is None: continue
+                    writer.writerow((name, i, impl, exclusive) + row)
+                    out.flush()
+                    print(name, i, impl, exclusive,
+                          *(f'{c}={v:.6g}' for c, v in zip(COLS, row)))
+
+if __name__ == '__main__':
+    main()
@@ -2,10 +2,11 @@ import argparse
 import os
 from pathlib import Path
 import re
-import sys
 
 from src.ilp import Block_ILP, Substring_ILP
 from src.utils import blocks, inter
+from src.utils.ledger import Ledger
+from src.utils.scheduler import Scheduler
 
 def _parse_args():
     parser = argparse.ArgumentParser(
@@ -20,6 +21,37 @@ def _parse_args():
     parser.add_argument('-r', '--reverse', action='store_true')
     parser.add_argument('-u', '--unbalanced', action='store_true')
     parser.add_argument('-s', '--signaled', action='store_true')
+    parser.add_argument('-g', '--warm-start', action='store_true',
+                        help='load a greedy partition as the MIP start')
+    parser.add_argument('-C', '--colgen', action='store_true',
+                        help='generate the cs columns from LP duals instead '
+                        'of adding every substring occurrence')
+    parser.add_argument('-e', '--exclusive', choices=['blocks', 'flow'],
+                        default='blocks',
+                        help='exclusive regions as every sub-interval block or '
+                             'as linear step/start variables')
+    parser.add_argument('-t', '--threads', type=int, default=1,
+                        help='solver threads of each run')
+    parser.add_argument('-j', '--cores', type=int,
+                        help='cores shared by the parallel runs (default: all)')
+    parser.add_argument('--memory', type=int, metavar='MB',
+                        help='memory cap of all the parallel runs together')
+    parser.add_argument('--ledger', metavar='FILE',
+                        help='sqlite record of the runs, to resume a sweep')
+    parser.add_argument('--retry', type=float, metavar='FACTOR',
+                        help='run again those that hit the time limit, with '
+                             'the limit raised by FACTOR')
+    parser.add_argument('--profile', nargs='?', const='time',
+                        choices=['time', 'memory'],
+                        help='add phase times and model counters to the stats '
+                             '(time, the default), and peak memory (memory)')
+    parser.add_argument('--memory-cap', type=int, metavar='MB',
+                        help='stop a run that needs more memory, reporting it '
+                             'as OOM-guard')
+    parser.add_argument('--results', default='results/runs.jsonl',
+                        metavar='FILE',
+                        help='JSON lines file every run appends its record '
+                             'to, compacted into Parquet at the end')
     args = parser.parse_args()
     return args
 
@@ -30,6 +62,12 @@ def main():
     
     log_dir = os.path.join('logs', args.impl)
     os.makedirs(log_dir, exist_ok=True)
+    memory = args.memory << 20 if args.memory else None
+    memory_cap = args.memory_cap << 20 if args.memory_cap else None
+    ledger = Ledger(args.ledger) if args.ledger else None
+    os.makedirs(os.path.dirname(args.results) or '.', exist_ok=True)
+    scheduler = Scheduler(args.cores, args.threads, memory, ledger,
+                          args.retry, args.results)
 
     for i in range(args.fst,args.lst + 1):
         filename = next(f
@@ -46,8 +84,16 @@ def main():
         mod = 'mod' in args.impl
         impl = Block_ILP if 'cb' in args.impl else Substring_ILP
         comp = inter.signaled_compare if args.signaled else inter.compare
-        with open(f'{log_dir}/{filename}.log', 'w') as sys.stdout:
-            impl(s1,s2,comp,args.reverse,args.signaled,not args.unbalanced,mod).run()
+        kwargs = {'colgen': True} if args.colgen and 'cs' in args.impl else {}
+        scheduler.add(f'{log_dir}/{filename}.log', impl,
+                      s1,s2,comp,args.reverse,args.signaled,not args.unbalanced,
+                      mod,warm_start=args.warm_start,
+                      exclusive=args.exclusive,profile=args.profile,
+                      memory_cap=memory_cap,
+                      meta={'driver': 'executor', 'impl': args.impl,
+                            'instance': filename},
+                      **kwargs)
+    scheduler.run()
 
 if __name__ == '__main__':
     main()
@@ -2,11 +2,12 @@ import argparse
 import os
 from pathlib import Path
 import re
-import sys
-from timeit import default_timer
 
 from src.ilp import Block_ILP, Substring_ILP
 from src.utils import blocks, inter
+from src.utils.cache import BlockCache
+from src.utils.ledger import Ledger
+from src.utils.scheduler import Scheduler
 
 def _parse_args():
     parser = argparse.ArgumentParser(
@@ -16,6 +17,48 @@ def _parse_args():
                         'cs uses the common substring one')
     # parser.add_argument('-r', '--reverse', action='store_true')
     # parser.add_argument('-s', '--signaled', action='store_true')
+    parser.add_argument('-c', '--cache', metavar='DIR',
+                        help='directory for cached block enumerations')
+    parser.add_argument('--cache-size', type=int, default=1024, metavar='MB',
+                        help='cache size limit before LRU eviction (in MB)')
+    parser.add_argument('-g', '--warm-start', action='store_true',
+                        help='load a greedy partition as the MIP start')
+    parser.add_argument('-C', '--colgen', action='store_true',
+                        help='generate the cs columns from LP duals instead '
+                        'of adding every substring occurrence')
+    parser.add_argument('-p', '--presolve', action='store_true',
+                        help='fix and drop variables before calling the solver')
+    parser.add_argument('-b', '--bound', choices=['only', 'stop'],
+                        help='only compute the lower bound, or stop the solver '
+                             'once an incumbent reaches it')
+    parser.add_argument('-k', '--cliques', nargs='?', const='root',
+                        choices=['root', 'lazy'],
+                        help='add clique cuts up front (root, the default) or '
+                             'from the solver callback (lazy)')
+    parser.add_argument('-d', '--decompose', action='store_true',
+                        help='solve independent subproblems separately')
+    parser.add_argument('-t', '--threads', type=int, default=1,
+                        help='solver threads of each run')
+    parser.add_argument('-j', '--cores', type=int,
+                        help='cores shared by the parallel runs (default: all)')
+    parser.add_argument('--memory', type=int, metavar='MB',
+                        help='memory cap of all the parallel runs together')
+    parser.add_argument('--ledger', metavar='FILE',
+                        help='sqlite record of the runs, to resume a sweep')
+    parser.add_argument('--retry', type=float, metavar='FACTOR',
+                        help='run again those that hit the time limit, with '
+                             'the limit raised by FACTOR')
+    parser.add_argument('--profile', nargs='?', const='time',
+                        choices=['time', 'memory'],
+                        help='add phase times and model counters to the stats '
+                             '(time, the default), and peak memory (memory)')
+    parser.add_argument('--memory-cap', type=int, metavar='MB',
+                        help='stop a run that needs more memory, reporting it '
+                             'as OOM-guard')
+    parser.add_argument('--results', default='results/runs.jsonl',
+                        metavar='FILE',
+                        help='JSON lines file every run appends its record '
+                             'to, compacted into Parquet at the end')
     args = parser.parse_args()
     return args
 
@@ -28,17 +71,27 @@ def main():
 
     log_dir = os.path.join('logs', args.impl)
     os.makedirs(log_dir, exist_ok=True)
+    cache = None
+    if args.cache:
+        cache = BlockCache(args.cache, args.cache_size << 20)
+    memory = args.memory << 20 if args.memory else None
+    memory_cap = args.memory_cap << 20 if args.memory_cap else None
+    ledger = Ledger(args.ledger) if args.ledger else None
+    os.makedirs(os.path.dirname(args.results) or '.', exist_ok=True)
+    scheduler = Scheduler(args.cores, args.threads, memory, ledger,
+                          args.retry, args.results)
 
     files = (f for f in os.listdir('instances')
              if re.match(rf'smcisp-2000-4-2000', f))
     for filename in files:
-        filename = Path(filename).stem
+        filename = instance = Path(filename).stem
 
         # filename = filename if args.reverse else filename[1:]
 
         mod = 'mod' in args.impl
         impl = Block_ILP if 'cb' in args.impl else Substring_ILP
         comp = inter.signaled_flex_compare # if args.signaled else inter.compare
+        kwargs = {'colgen': True} if args.colgen and 'cs' in args.impl else {}
         with open(f'instances/{filename}.in') as f:
             lines = f.readlines()
             file_suffix = "-".join(filename.split("-")[1:])
@@ -52,11 +105,17 @@ def main():
                 i2u = [round(1.3 * x) for x in i2]
                 i2 = list(zip(i2l, i2u))
                 filename = f'smcfisp-{i:02d}-{file_suffix}-07'
-                with open(f'{log_dir}/{filename}.log', 'w') as sys.stdout:
-                    # print(i2)
-                    t = default_timer()
-                    impl(s1,s2,comp,False,True,True,mod,True, i1,i2).run()
-                    print(f'total_time: {default_timer()-t}')
+                scheduler.add(f'{log_dir}/{filename}.log', impl,
+                              s1,s2,comp,False,True,True,mod,True, i1,i2,
+                              cache=cache,warm_start=args.warm_start,
+                              presolve=args.presolve,bound=args.bound,
+                              cliques=args.cliques,
+                              decompose=args.decompose,
+                              profile=args.profile,memory_cap=memory_cap,
+                              meta={'driver': 'inter_executor',
+                                    'impl': args.impl, 'instance': instance,
+                                    'case': i, 'variant': '07'},
+                              **kwargs)
                 # i1 = [0] * len(i1)
                 # i2 = [(0,0)] * len(i2)
                 # filename = f'smcsp-{i:02d}-{file_suffix}'
@@ -65,6 +124,7 @@ def main():
                 #     impl(s1,s2,comp,False,True,True,mod,True, i1,i2).run()
                 #     print(f'total_time: {default_timer()-t}')
                 i += 1
+    scheduler.run()
 
 if __name__ == '__main__':
     main()
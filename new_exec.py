@@ -2,24 +2,94 @@ import argparse
 import os
 from pathlib import Path
 import re
-import sys
 from timeit import default_timer
 
 from src.ilp import Block_ILP, Substring_ILP
 from src.utils import blocks, inter
+from src.utils.cache import BlockCache, ModelCache
+from src.utils.ledger import Ledger
+from src.utils.scheduler import Scheduler
 
-def run_tests_for_impl(impl, log_dir):
-    impl = Block_ILP if 'cb' in impl else Substring_ILP
+def _parse_args():
+    parser = argparse.ArgumentParser(
+        description='Runs both ILPs on every intergenic SMCISP instance')
+    parser.add_argument('-c', '--cache', metavar='DIR',
+                        help='directory for cached block enumerations')
+    parser.add_argument('--cache-size', type=int, default=1024, metavar='MB',
+                        help='cache size limit before LRU eviction (in MB)')
+    parser.add_argument('-m', '--model-cache', metavar='DIR',
+                        help='directory for cached formulated models')
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help='processes used to enumerate common blocks')
+    parser.add_argument('-g', '--warm-start', action='store_true',
+                        help='load a greedy partition as the MIP start')
+    parser.add_argument('-C', '--colgen', action='store_true',
+                        help='generate the cs columns from LP duals instead '
+                        'of adding every substring occurrence')
+    parser.add_argument('-p', '--presolve', action='store_true',
+                        help='fix and drop variables before calling the solver')
+    parser.add_argument('-b', '--bound', choices=['only', 'stop'],
+                        help='only compute the lower bound, or stop the solver '
+                             'once an incumbent reaches it')
+    parser.add_argument('-k', '--cliques', nargs='?', const='root',
+                        choices=['root', 'lazy'],
+                        help='add clique cuts up front (root, the default) or '
+                             'from the solver callback (lazy)')
+    parser.add_argument('-d', '--decompose', action='store_true',
+                        help='solve independent subproblems separately')
+    parser.add_argument('-e', '--exclusive', choices=['blocks', 'flow'],
+                        default='blocks',
+                        help='exclusive regions as every sub-interval block or '
+                             'as linear step/start variables')
+    parser.add_argument('-t', '--threads', type=int, default=1,
+                        help='solver threads of each run')
+    parser.add_argument('-j', '--cores', type=int,
+                        help='cores shared by the parallel runs (default: all)')
+    parser.add_argument('--memory', type=int, metavar='MB',
+                        help='memory cap of all the parallel runs together')
+    parser.add_argument('--ledger', metavar='FILE',
+                        help='sqlite record of the runs, to resume a sweep')
+    parser.add_argument('--retry', type=float, metavar='FACTOR',
+                        help='run again those that hit the time limit, with '
+                             'the limit raised by FACTOR')
+    parser.add_argument('--profile', nargs='?', const='time',
+                        choices=['time', 'memory'],
+                        help='add phase times and model counters to the stats '
+                             '(time, the default), and peak memory (memory)')
+    parser.add_argument('--memory-cap', type=int, metavar='MB',
+                        help='stop a run that needs more memory, reporting it '
+                             'as OOM-guard')
+    parser.add_argument('--results', default='results/runs.jsonl',
+                        metavar='FILE',
+                        help='JSON lines file every run appends its record '
+                             'to, compacted into Parquet at the end')
+    args = parser.parse_args()
+    return args
+
+def run_tests(impls, scheduler, cache=None, workers=1, warm_start=False,
+              presolve=False, bound=None, cliques=False, decompose=False,
+              exclusive='blocks', model_cache=None, profile=False,
+              memory_cap=None, colgen=False):
     reverse = False
     signaled = True
     mod = False
     intergenic = True
+    options = dict(cache=cache,workers=workers,warm_start=warm_start,
+                   presolve=presolve,bound=bound,cliques=cliques,
+                   decompose=decompose,exclusive=exclusive,profile=profile,
+                   memory_cap=memory_cap,model_cache=model_cache)
+    formulations = []
+    for name in impls:
+        impl = Block_ILP if 'cb' in name else Substring_ILP
+        kwargs = {'colgen': True} if colgen and impl is Substring_ILP else {}
+        formulations.append((name, impl, os.path.join('logs', name),
+                             {**options, **kwargs}))
     
     files = (f for f in os.listdir('instances'))
             #  if re.match(rf'smcisp-1250-04-1000-06', f))
             #  if re.match(rf'test-', f))
     for filename in files:
-        filename = Path(filename).stem
+        filename = instance = Path(filename).stem
 
         with open(f'instances/{filename}.in') as f:
             lines = f.readlines()
@@ -38,39 +108,73 @@ def run_tests_for_impl(impl, log_dir):
                 i1_ = [0] * len(i1)
                 i2_ = [0] * len(i2)
                 filename = f'smcfisp-{i:02d}-{file_suffix}-N'
-                with open(f'{log_dir}/{filename}.log', 'w') as sys.stdout:
-                    t = default_timer()
-                    impl(s1,s2,comp,reverse,signaled,balanced,mod,intergenic,
-                         i1_,i2_).run()
-                    print(f'total_time: {default_timer()-t}')
-
-                filename = f'smcfisp-{i:02d}-{file_suffix}-0'
-                with open(f'{log_dir}/{filename}.log', 'w') as sys.stdout:
-                    t = default_timer()
-                    impl(s1,s2,comp,reverse,signaled,balanced,mod,intergenic,
-                         i1,i2).run()
-                    print(f'total_time: {default_timer()-t}')
+                for name, impl, log_dir, kwargs in formulations:
+                    scheduler.add(f'{log_dir}/{filename}.log', impl,
+                                  s1,s2,comp,reverse,signaled,balanced,mod,
+                                  intergenic,i1_,i2_,**kwargs,
+                                  meta={'driver': 'new_exec', 'impl': name,
+                                        'instance': instance,
+                                        'case': i, 'variant': 'N'})
 
-                comp = inter.signaled_flex_compare
-                for interval in (0.25, 0.5):
-                    i2l = [round((1 - interval) * x) for x in i2]
-                    i2u = [round((1 + interval) * x) for x in i2]
-                    i2_ = list(zip(i2l, i2u))
-                    int_str = str(interval).replace('.', '')
+                # every tolerance of both formulations comes from one sweep,
+                # enumerated only if some of them still has to run and
+                # charged to those evenly
+                intervals = (0.25, 0.5)
+                variants = [(0, '0', inter.signaled_compare, i2)]
+                for level, interval in enumerate(intervals, 1):
+                    variants.append((level, str(interval).replace('.', ''),
+                                     inter.signaled_flex_compare,
+                                     inter.flex_bounds(i2, interval)))
+                jobs = []
+                for level, int_str, comp, i2_ in variants:
                     filename = f'smcfisp-{i:02d}-{file_suffix}-{int_str}'
-                    with open(f'{log_dir}/{filename}.log', 'w') as sys.stdout:
-                        t = default_timer()
-                        impl(s1,s2,comp,reverse,signaled,balanced,mod,
-                             intergenic,i1,i2_).run()
-                        print(f'total_time: {default_timer()-t}')
+                    for name, impl, log_dir, kwargs in formulations:
+                        args = (f'{log_dir}/{filename}.log', impl,
+                                s1,s2,comp,reverse,signaled,balanced,mod,
+                                intergenic,i1,i2_)
+                        if not scheduler.skips(*args, blocks=None, **kwargs):
+                            jobs.append((level, int_str, name, kwargs, args))
+
+                if jobs:
+                    t = default_timer()
+                    sweep = inter.find_substrings_sweep(s1, s2, i1, i2,
+                                                        (0,) + intervals,
+                                                        reverse, signaled)
+                    setup = (default_timer() - t) / len(jobs)
+                    levels = {level: inter.filter_tolerance(*sweep, level)
+                              for level, *_ in jobs}
+                    del sweep
+                for level, int_str, name, kwargs, args in jobs:
+                    scheduler.add(*args, blocks=levels[level], setup=setup,
+                                  **kwargs,
+                                  meta={'driver': 'new_exec', 'impl': name,
+                                        'instance': instance,
+                                        'case': i, 'variant': int_str})
 
                 i += 1
 
 def main():
-    for impl in ('cb', 'cs'):
-        log_dir = os.path.join('logs', impl)
-        os.makedirs(log_dir, exist_ok=True)
-        run_tests_for_impl(impl, log_dir)
+    args = _parse_args()
+    cache = None
+    if args.cache:
+        cache = BlockCache(args.cache, args.cache_size << 20)
+    model_cache = None
+    if args.model_cache:
+        model_cache = ModelCache(args.model_cache, args.cache_size << 20)
+    memory = args.memory << 20 if args.memory else None
+    memory_cap = args.memory_cap << 20 if args.memory_cap else None
+    ledger = Ledger(args.ledger) if args.ledger else None
+    os.makedirs(os.path.dirname(args.results) or '.', exist_ok=True)
+    scheduler = Scheduler(args.cores, args.threads, memory, ledger,
+                          args.retry, args.results)
+    impls = ('cb', 'cs')
+    for impl in impls:
+        os.makedirs(os.path.join('logs', impl), exist_ok=True)
+    run_tests(impls, scheduler, cache, args.workers, args.warm_start,
+              args.presolve, args.bound, args.cliques, args.decompose,
+              args.exclusive, model_cache, args.profile, memory_cap,
+              args.colgen)
+    scheduler.run()
 
 if __name__ == '__main__':
     main()
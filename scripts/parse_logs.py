@@ -1,58 +1,25 @@
-import csv
-from operator import itemgetter
 import os
-import re
 
 import matplotlib.pyplot as plt
 import pandas as pd
 
+from src.utils.results import load
+
 RESULTS_DIR = os.path.join('results')
-LOGS_DIR = os.path.join('logs')
-LOG_PARSE_REGEX = re.compile(r'.?mcsp_(\d+)-(\d+)_(\d+)_(\d+)_(\d+).log')
+RUNS = os.path.join(RESULTS_DIR, 'runs.jsonl')
+INSTANCE_REGEX = r'.?mcsp_(\d+)-(\d+)_(\d+)_(\d+)_(\d+)'
+INFO = ('index', 'length', 'n_chars', 'n_ops', 'seed')
+STATS = ('runtime', 'first_sol', 'first_time', 'last_sol', 'last_time', 'gap',
+         'best_bd')
 
-def parse_logs(impl):
-    logs = []
-    dir = os.path.join(LOGS_DIR, impl)
-    for log in sorted(os.listdir(dir)):
-        m = LOG_PARSE_REGEX.match(log).groups()
-        path = os.path.join(dir, log)
-        with open(path, 'r') as log_file:
-            lines = log_file.readlines()
-        found = False
-        for i, line in enumerate(lines):
-            if line.startswith('###'):
-                lines = lines[i + 1:]
-                found = True
-                break
-        if found:
-            logs.append((*m, *map(lambda x: x.split(':')[1].strip(), lines)))
-    return logs
+def parse_logs(runs, impl):
+    runs = runs[runs['impl'] == impl]
+    info = runs['instance'].str.extract(INSTANCE_REGEX).astype(int)
+    info.columns = INFO
+    return pd.concat([info, runs[list(STATS)]], axis=1).sort_values('index')
 
 def write_logs(impl, logs):
-    with open(os.path.join(RESULTS_DIR, f'{impl}.csv'), 'w', newline='') as res:
-        writer = csv.writer(res)
-        writer.writerow(('index', 'length', 'n_chars', 'n_ops', 'seed',
-                         'runtime', 'first_sol', 'first_time', 'last_sol',
-                         'last_time', 'gap', 'best_bd'))
-        writer.writerows(logs)
-
-def _typecast_row(row):
-    types = (
-        (
-            int,
-            ('index','length','n_chars','n_ops','seed')
-        ),
-        (
-            float,
-            ('runtime','first_time','last_time','gap','best_bd','first_sol'
-             ,'last_sol')
-        ),
-    )
-    
-    res = dict(row)
-    for cast, cols in types:
-        res.update({col: cast(row[col]) for col in cols})
-    return res
+    logs.to_csv(os.path.join(RESULTS_DIR, f'{impl}.csv'), index=False)
 
 def generate_graph(dfs, impls, column, tests, ns_chars):
     markers = {'cb': '^b', 'cb-mod': 'sg', 'cs': 'Pr', 'cs-mod': '*m'}
@@ -66,6 +33,7 @@ def generate_graphs():
     markers = ('^b', 'sg', 'Pr', '*m')
     dfs = {}
     for name in os.listdir(RESULTS_DIR):
+        if not name.endswith('.csv'): continue
         path = os.path.join(RESULTS_DIR, name)
         impl = name.split('.')[0]
         dfs[impl] = pd.read_csv(path)
@@ -82,11 +50,16 @@ def generate_graphs():
 
 def main():
     impls = ('cb', 'cb-mod', 'cs', 'cs-mod')
+    runs = load(RUNS, ('executor',))
+    if runs.empty:
+        print(f'no results in {RUNS}')
+        return
+    # a run that was retried counts once, with its last record
+    runs = runs.drop_duplicates(['log', 'params'], keep='last')
     for impl in impls:
-        logs = parse_logs(impl)
-        write_logs(impl,logs)
+        write_logs(impl, parse_logs(runs, impl))
 
 if __name__ == '__main__':
     os.makedirs(RESULTS_DIR, exist_ok=True)
     main()
-    # generate_graphs()
\ No newline at end of file
+    # generate_graphs()
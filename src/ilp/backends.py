@@ -0,0 +1,366 @@
+import abc
+from importlib.util import find_spec
+import re
+from timeit import default_timer
+
+import numpy as np
+import scipy.sparse as sp
+
+# solver packages are imported only by the backend that uses them: the
+# highspy and ortools wheels bundle conflicting HiGHS builds and cannot be
+# loaded into the same process
+
+class Backend(abc.ABC):
+    # 0/1 program in matrix form: min obj @ v + const s.t. A @ v (sense) rhs,
+    # with sense one of '<', '=', '>' as in gurobipy's addMConstr
+    module = None
+    # whether optimize() calls self.separator on fractional node solutions
+    cut_callback = False
+
+    def __init__(self, name, limit, threads=1):
+        self.name = name
+        self.limit = limit
+        self.threads = threads
+        self.obj = np.empty(0)
+        self.const = 0
+        self.rows = []
+        self.start = None
+        # a known lower bound: the solve stops once an incumbent reaches it
+        self.target = None
+        # callable from an LP point to a CSR matrix of violated cuts
+        # sum(x) <= 1, and the root node bound once cuts were added
+        self.separator = None
+        self.root_bound = None
+
+        self.runtime = 0
+        self.gap = float('inf')
+        self.bound = float('-inf')
+        self.X = None
+
+    @property
+    def num_vars(self):
+        return len(self.obj)
+
+    def add_vars(self, obj):
+        start = self.num_vars
+        self.obj = np.concatenate((self.obj, obj))
+        return slice(start, self.num_vars)
+
+    def add_constrs(self, A, sense, rhs):
+        self.rows.append((sp.csr_matrix(A), sense,
+                          np.broadcast_to(np.asarray(rhs, dtype=float),
+                                          A.shape[0])))
+
+    def set_objective(self, obj, const=0):
+        self.obj = np.asarray(obj, dtype=float)
+        self.const = const
+
+    def set_start(self, start):
+        # NaN entries are left for the solver to complete
+        self.start = np.asarray(start, dtype=float)
+
+    def _report_start(self, watcher):
+        # solvers that do not say whether they used the start: a complete
+        # start counts as accepted if no worse incumbent was ever reported
+        if self.start is None or np.isnan(self.start).any(): return
+        obj = self.obj @ self.start + self.const
+        if watcher.first_found and watcher.first_sol <= obj + 1e-6:
+            watcher.update_start(obj)
+
+    def _stacked(self):
+        A = sp.vstack([A for A, _, _ in self.rows] or
+                      [sp.csr_matrix((0, self.num_vars))], format='csr')
+        lo, hi = [], []
+        for _, sense, rhs in self.rows:
+            lo.append(rhs if sense != '<' else np.full(len(rhs), -np.inf))
+            hi.append(rhs if sense != '>' else np.full(len(rhs), np.inf))
+        return A, np.concatenate(lo or [[]]), np.concatenate(hi or [[]])
+
+    def write_mps(self, path):
+        # free MPS with columns x<i> and rows r<i> in self.rows order; the
+        # objective constant goes in the RHS of the objective row negated, as
+        # Gurobi and HiGHS read it
+        A = sp.vstack([A for A, _, _ in self.rows] or
+                      [sp.csr_matrix((0, self.num_vars))], format='csc')
+        types = np.concatenate([np.full(B.shape[0], 'LEG'['<=>'.index(s)])
+                                for B, s, _ in self.rows] or [[]])
+        rhs = np.concatenate([rhs for _, _, rhs in self.rows] or [[]])
+
+        cols = np.repeat(np.arange(self.num_vars), np.diff(A.indptr))
+        # every column needs a line, so empty ones get a zero cost entry
+        nz = np.flatnonzero((self.obj != 0) | (np.diff(A.indptr) == 0))
+        order = np.lexsort((np.r_[np.zeros(len(nz)), np.ones(len(cols))],
+                            np.r_[nz, cols]))
+        col = np.r_[nz, cols][order].tolist()
+        row = np.r_[np.full(len(nz), -1), A.indices][order].tolist()
+        val = np.r_[self.obj[nz], A.data][order].tolist()
+
+        with open(path, 'w') as f:
+            f.write(f'NAME {self.name.replace(" ", "_")}\nROWS\n N obj\n')
+            f.writelines(f' {t} r{i}\n' for i, t in enumerate(types.tolist()))
+            f.write("COLUMNS\n    MARKER 'MARKER' 'INTORG'\n")
+            f.writelines(f'    x{c} {f"r{r}" if r >= 0 else "obj"} {v:.17g}\n'
+                         for c, r, v in zip(col, row, val))
+            f.write("    MARKER 'MARKER' 'INTEND'\nRHS\n")
+            if self.const:
+                f.write(f'    rhs obj {-self.const:.17g}\n')
+            f.writelines(f'    rhs r{i} {b:.17g}\n'
+                         for i, b in enumerate(rhs.tolist()) if b)
+            f.write('BOUNDS\n')
+            f.writelines(f' BV bnd x{i}\n' for i in range(self.num_vars))
+            f.write('ENDATA\n')
+
+    def relaxation(self, penalty=None):
+        # LP relaxation through scipy's HiGHS, whatever the backend, returning
+        # the objective, the primal values and one dual per row; a penalty
+        # gives every equality row an artificial column of that cost so a
+        # restricted model stays feasible
+        from scipy.optimize import linprog
+
+        A, lo, hi = self._stacked()
+        if not self.num_vars and penalty is None:
+            if not self._empty_feasible(lo, hi): return None
+            return self.const, np.empty(0), np.zeros(A.shape[0])
+        eq = lo == hi
+        up = ~eq & np.isfinite(hi)
+        down = ~eq & np.isfinite(lo)
+        A_eq, b_eq = A[eq], hi[eq]
+        c = self.obj
+        if penalty is not None:
+            art = np.flatnonzero(b_eq > 0)
+            A_eq = sp.hstack([A_eq, sp.csr_matrix(
+                (np.ones(len(art)), (art, np.arange(len(art)))),
+                shape=(A_eq.shape[0], len(art)))], format='csr')
+            c = np.concatenate((c, np.full(len(art), penalty)))
+        pad = A_eq.shape[1] - A.shape[1]
+        A_ub = sp.vstack([A[up], -A[down]], format='csr')
+        A_ub = sp.hstack([A_ub, sp.csr_matrix((A_ub.shape[0], pad))],
+                         format='csr')
+
+        res = linprog(c, A_ub, np.concatenate((hi[up], -lo[down])), A_eq, b_eq,
+                      bounds=(0, 1), method='highs')
+        if res.x is None: return None
+
+        y = np.zeros(A.shape[0])
+        y[eq] = res.eqlin.marginals
+        y[up] = res.ineqlin.marginals[:up.sum()]
+        y[down] -= res.ineqlin.marginals[up.sum():]
+        return res.fun + self.const, res.x[:self.num_vars], y
+
+    def _empty_feasible(self, lo, hi):
+        return bool(((lo <= 0) & (hi >= 0)).all())
+
+    def optimize_empty(self, watcher):
+        # a model without columns, all of them fixed by presolve: the empty
+        # point is its only solution, of objective const, unless a row was
+        # left violated. No solver takes an empty model, so none is called
+        _, lo, hi = self._stacked()
+        self.runtime = 0
+        if not self._empty_feasible(lo, hi):
+            self.bound = float('inf')
+            return
+        self.bound = self.const
+        self.gap = 0
+        self.X = np.empty(0)
+        watcher.update(self.const, 0)
+        watcher.update_bound(self.bound)
+        self._report_start(watcher)
+
+    @abc.abstractmethod
+    def optimize(self, watcher):
+        pass
+
+class GurobiBackend(Backend):
+    module = 'gurobipy'
+    cut_callback = True
+
+    def optimize(self, watcher):
+        import gurobipy as gp
+        from gurobipy import GRB
+
+        def callback(model, where):
+            if where == GRB.Callback.MESSAGE:
+                # a complete start is loaded as is, a partial one is
+                # completed first and reported differently
+                msg = model.cbGet(GRB.Callback.MSG_STRING)
+                if m := re.match(r'(?:Loaded user MIP start|User MIP start '
+                                 r'produced solution) with objective (\S+)',
+                                 msg):
+                    watcher.update_start(float(m[1]))
+            elif where == GRB.Callback.MIP:
+                watcher.update_bound(model.cbGet(GRB.Callback.MIP_OBJBND))
+                if model.cbGet(GRB.Callback.MIP_NODCNT) == 0:
+                    self.root_bound = model.cbGet(GRB.Callback.MIP_OBJBND)
+            elif (where == GRB.Callback.MIPNODE and
+                  self.separator is not None):
+                if model.cbGet(GRB.Callback.MIPNODE_STATUS) != GRB.OPTIMAL:
+                    return
+                C = self.separator(np.asarray(model.cbGetNodeRel(v)))
+                for r in range(C.shape[0]):
+                    idx = C.indices[C.indptr[r]:C.indptr[r + 1]]
+                    model.cbCut(gp.quicksum(x[i] for i in idx) <= 1)
+            elif where == GRB.Callback.MIPSOL:
+                watcher.update(model.cbGet(GRB.Callback.MIPSOL_OBJ),
+                               model.cbGet(GRB.Callback.RUNTIME))
+
+        try:
+            model = gp.Model(self.name)
+            model.Params.TimeLimit = self.limit
+            model.Params.Threads = self.threads
+            v = model.addMVar(self.num_vars, 0, 1, self.obj, GRB.BINARY)
+            x = v.tolist()
+            for A, sense, rhs in self.rows:
+                model.addMConstr(A, v, sense, rhs)
+            model.ObjCon = self.const
+            if self.start is not None:
+                v.Start = np.where(np.isnan(self.start), GRB.UNDEFINED,
+                                   self.start)
+            if self.target is not None:
+                model.Params.BestObjStop = self.target + 1e-6
+            if self.separator is not None:
+                model.Params.PreCrush = 1
+            self.model = model
+
+            model.optimize(callback)
+            self.runtime = model.Runtime
+            self.bound = model.ObjBoundC
+            if model.NodeCount < 1:
+                self.root_bound = self.bound
+            if model.SolCount:
+                self.gap = model.MIPGap
+                self.X = v.X
+        except gp.GurobiError as e:
+            if e.errno == GRB.Error.OUT_OF_MEMORY:
+                raise MemoryError(str(e)) from e
+            print('Error code ' + str(e.errno) + ': ' + str(e))
+
+class HighsBackend(Backend):
+    # scipy.optimize.milp drives the same HiGHS solver when highspy is not
+    # installed, but reports no incumbents before the final one
+    def optimize(self, watcher):
+        try:
+            import highspy
+        except ImportError:
+            return self._optimize_scipy(watcher)
+
+        A, lo, hi = self._stacked()
+        lp = highspy.HighsLp()
+        lp.num_col_ = self.num_vars
+        lp.num_row_ = A.shape[0]
+        lp.col_cost_ = self.obj
+        lp.col_lower_ = np.zeros(self.num_vars)
+        lp.col_upper_ = np.ones(self.num_vars)
+        lp.row_lower_ = lo
+        lp.row_upper_ = hi
+        lp.offset_ = self.const
+        lp.integrality_ = [highspy.HighsVarType.kInteger] * self.num_vars
+        lp.a_matrix_.format_ = highspy.MatrixFormat.kRowwise
+        lp.a_matrix_.num_col_ = self.num_vars
+        lp.a_matrix_.num_row_ = A.shape[0]
+        lp.a_matrix_.start_ = A.indptr
+        lp.a_matrix_.index_ = A.indices
+        lp.a_matrix_.value_ = A.data
+
+        h = highspy.Highs()
+        h.setOptionValue('output_flag', False)
+        h.setOptionValue('time_limit', float(self.limit))
+        h.setOptionValue('threads', self.threads)
+        h.passModel(lp)
+        if self.start is not None:
+            idx = np.flatnonzero(~np.isnan(self.start)).astype(np.int32)
+            h.setSolution(len(idx), idx, self.start[idx])
+        h.cbMipImprovingSolution.subscribe(lambda e: watcher.update(
+            e.data_out.objective_function_value, e.data_out.running_time))
+        if self.target is not None:
+            def interrupt(e):
+                if e.data_out.objective_function_value <= self.target + 1e-6:
+                    e.data_in.user_interrupt = True
+            h.cbMipInterrupt.subscribe(interrupt)
+        h.run()
+
+        info = h.getInfo()
+        self.runtime = h.getRunTime()
+        self.bound = info.mip_dual_bound
+        if info.primal_solution_status == 2:
+            # solutions found inside presolve skip the improving callback
+            watcher.update(info.objective_function_value, self.runtime)
+            self.gap = info.mip_gap
+            self.X = np.array(h.getSolution().col_value)
+        self._report_start(watcher)
+
+    def _optimize_scipy(self, watcher):
+        # milp takes no starting solution nor a stopping target, so
+        # self.start and self.target go unused here
+        from scipy.optimize import Bounds, LinearConstraint, milp
+
+        A, lo, hi = self._stacked()
+        t = default_timer()
+        res = milp(self.obj, integrality=np.ones(self.num_vars),
+                   bounds=Bounds(0, 1), constraints=LinearConstraint(A, lo, hi),
+                   options={'time_limit': self.limit})
+        self.runtime = default_timer() - t
+        if res.x is not None:
+            watcher.update(res.fun + self.const, self.runtime)
+            self.gap = getattr(res, 'mip_gap', 0)
+            self.X = res.x
+        if (bound := getattr(res, 'mip_dual_bound', None)) is not None:
+            self.bound = bound + self.const
+
+class CPSatBackend(Backend):
+    # CP-SAT needs integral coefficients, which both formulations have
+    module = 'ortools'
+
+    def optimize(self, watcher):
+        from ortools.sat.python import cp_model
+
+        model = cp_model.CpModel()
+        v = [model.new_bool_var('') for _ in range(self.num_vars)]
+        for A, sense, rhs in self.rows:
+            for r in range(A.shape[0]):
+                a, b = A.indptr[r], A.indptr[r + 1]
+                expr = cp_model.LinearExpr.weighted_sum(
+                    [v[i] for i in A.indices[a:b]],
+                    np.rint(A.data[a:b]).astype(int).tolist())
+                c = int(round(rhs[r]))
+                model.add(expr <= c if sense == '<' else
+                          expr >= c if sense == '>' else expr == c)
+        model.minimize(cp_model.LinearExpr.weighted_sum(
+            v, np.rint(self.obj).astype(int).tolist()) + int(self.const))
+        if self.start is not None:
+            for i in np.flatnonzero(~np.isnan(self.start)).tolist():
+                model.add_hint(v[i], int(self.start[i]))
+
+        target = self.target
+        class Callback(cp_model.CpSolverSolutionCallback):
+            def on_solution_callback(self):
+                watcher.update(self.objective_value, self.wall_time)
+                watcher.update_bound(self.best_objective_bound)
+                if (target is not None and
+                        self.objective_value <= target + 1e-6):
+                    self.stop_search()
+
+        solver = cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = self.limit
+        solver.parameters.num_workers = self.threads
+        status = solver.solve(model, Callback())
+
+        self.runtime = solver.wall_time
+        self.bound = solver.best_objective_bound
+        if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            obj = solver.objective_value
+            self.gap = abs(obj - self.bound) / max(abs(obj), 1e-10)
+            self.X = np.array([solver.value(x) for x in v], dtype=float)
+        self._report_start(watcher)
+
+BACKENDS = {
+    'gurobi': GurobiBackend,
+    'highs': HighsBackend,
+    'cpsat': CPSatBackend,
+}
+
+def get_backend(name):
+    backend = BACKENDS[name]
+    if backend.module and find_spec(backend.module) is None:
+        raise ImportError(f'the {name} backend requires the '
+                          f'{backend.module} package')
+    return backend
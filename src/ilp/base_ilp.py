@@ -1,13 +1,33 @@
 import abc
+from contextlib import contextmanager
+import math
+from timeit import default_timer
 
-import gurobipy as gp
+import numpy as np
+import scipy.sparse as sp
 
+from .backends import BACKENDS, get_backend
+from .cliques import CliqueSeparator
+from .decompose import solve, split
+from .presolve import Reduction, presolve
 from .watcher import Watcher
+from ..utils.greedy import greedy_exclusive
+from ..utils.instrument import (CountingCompare, Profile, peak_rss,
+                                restore_memory_cap, set_memory_cap)
+from ..utils.inter import get_abundant_chars, get_exclusive_blocks
+from ..utils.parallel import find_substrings_par
+from ..utils.suffix import calls_compare, find_substrings_sa
+from ..utils.table import coverage
 
 EPS = 1e-4
 
 class BaseILP(abc.ABC):
-    def __init__(self, l1, l2, compare, reverse, signaled, intergenic, i1=None, i2=None, limit=3600):
+    def __init__(self, l1, l2, compare, reverse, signaled, intergenic, i1=None,
+                 i2=None, limit=3600, cache=None, workers=1, blocks=None,
+                 backend='gurobi', warm_start=False, presolve=False,
+                 bound=None, cliques=False, decompose=False,
+                 exclusive='blocks', model_cache=None, threads=1,
+                 profile=False, memory_cap=None):
         self.l1 = l1
         self.l2 = l2
         self.compare = compare
@@ -21,8 +41,184 @@ class BaseILP(abc.ABC):
             self.i1 = [0] * (len(l1) - 1)
             self.i2 = [0] * (len(l2) - 1)
         self.limit = limit
+        self.cache = cache
+        self.workers = workers
+        self.blocks = blocks
+        self.backend = get_backend(backend)
+        self.warm_start = warm_start
+        self.presolve = presolve
+        # None solves the ILP, 'only' stops at the lower bound and 'stop'
+        # hands the lower bound to the solver as a stopping target
+        self.bound = bound
+        self.cliques = cliques
+        self.decompose = decompose
+        # 'blocks' has a column per sub-interval of every abundant run,
+        # 'flow' a step and a start column per abundant position
+        self.exclusive = exclusive
+        self.model_cache = model_cache if blocks is None else None
+        # solver threads, the cores budget of one run
+        self.threads = threads
+        # phase times and counters, added to the stats when enabled
+        self.profile = Profile(profile)
+        # bytes of address space the run may take while enumerating and in
+        # run(); past it the stage it was in is reported as an OOM-guard
+        # status
+        self.memory_cap = memory_cap
+        self.cache_hit = False
+        self._cached = self._model_key = None
+        self.stage = 'enumerate'
+        self.oom = None
+        self.reduction = None
+        self.stats = dict()
+        self.result = dict()
         self.sol = []
 
+    @contextmanager
+    def _guard(self):
+        # the cap only holds inside, so that an instance built but never run,
+        # or one that failed, leaves the process as it found it
+        old = set_memory_cap(self.memory_cap)
+        try:
+            yield
+        except MemoryError:
+            self.oom = self.stage
+        finally:
+            restore_memory_cap(old)
+
+    @abc.abstractmethod
+    def _prepare(self):
+        pass
+
+    def _needs_instance(self):
+        # the combinatorial bound reads the blocks, which a cached model
+        # does not keep
+        return self.bound is not None
+
+    def _setup(self):
+        # called once the subclass settings are in place. A cached model is
+        # looked up first, and on a hit the enumeration only runs if
+        # something besides the model needs it; _restore rebuilds what the
+        # solution is read from
+        if self.model_cache:
+            self._model_key = self.model_cache.key(
+                self.l1, self.l2, self.i1, self.i2, self.compare,
+                self.reverse, self.signaled, self._settings())
+            with self.profile.phase('model_cache'):
+                self._cached = self.model_cache.load(self._model_key)
+            self.cache_hit = self._cached is not None
+        if not self.cache_hit or self._needs_instance():
+            with self._guard():
+                self._prepare()
+
+    def _enumerate(self):
+        B1, B2, E1, E2 = self._find_blocks()
+        self.profile.count('blocks', len(B1))
+        self.profile.count('exclusive_blocks', len(E1) + len(E2))
+        return (B1, B2, E1, E2)
+
+    def _find_blocks(self):
+        cache = self.cache if self.blocks is None else None
+        if cache:
+            key = cache.key(self.l1, self.l2, self.i1, self.i2,
+                                 self.compare, self.reverse, self.signaled)
+            with self.profile.phase('block_cache'):
+                blocks = cache.load(key)
+            if blocks is not None:
+                return blocks
+
+        if self.blocks is not None:
+            B1, B2 = self.blocks
+        elif self.workers > 1:
+            # calls made in the worker processes are not counted
+            with self.profile.phase('common_blocks'):
+                B1, B2 = find_substrings_par(self.l1, self.l2, self.i1,
+                                             self.i2, self.compare,
+                                             self.reverse, self.signaled,
+                                             self.workers)
+        else:
+            # counted only where the engine calls the compare function, so
+            # that a missing count is not read as no comparisons
+            compare = self.compare
+            counting = (self.profile.enabled and
+                        calls_compare(compare, self.reverse))
+            if counting:
+                compare = CountingCompare(compare)
+            with self.profile.phase('common_blocks'):
+                B1, B2 = find_substrings_sa(self.l1, self.l2, self.i1, self.i2,
+                                            compare, self.reverse,
+                                            self.signaled)
+            if counting:
+                self.profile.count('compare_calls', compare.calls)
+        with self.profile.phase('exclusive_blocks'):
+            excl1, excl2 = get_abundant_chars(self.l1, self.l2)
+            E1 = get_exclusive_blocks(self.l1, excl1)
+            E2 = get_exclusive_blocks(self.l2, excl2)
+        if cache:
+            cache.store(key, B1, B2, E1, E2)
+        return (B1, B2, E1, E2)
+
+    def _steps(self, E):
+        # exclusive positions of a string and whether each one opens a run;
+        # every sub-interval of a run is an exclusive block, so the positions
+        # are those of the length one blocks
+        P = np.sort(E[E[:, 1] == 1, 0])
+        return P, np.diff(P, prepend=-2) > 1
+
+    def _exclusive_coverage(self, nB, n):
+        # coverage of the exclusive columns of both strings over string nB
+        A = []
+        for i, E in enumerate((self.E1, self.E2), 1):
+            if self.exclusive == 'flow':
+                P, _ = self._steps(E)
+                A.append(sp.csr_matrix(
+                    (np.ones(len(P)), (P, np.arange(len(P)))),
+                    shape=(n, 2 * len(P))) if i == nB
+                    else sp.csr_matrix((n, 2 * len(P))))
+            else:
+                A.append(coverage(E[:, 0], E[:, 1], n) if i == nB
+                         else sp.csr_matrix((n, len(E))))
+        return A
+
+    def _add_exclusive_vars(self):
+        # one group of columns per string, in _exclusive_coverage order; under
+        # 'flow' the step columns u_j (j is covered exclusively) come first
+        # and cost nothing, the start columns s_j cost one block each
+        self._excl = []
+        for E in (self.E1, self.E2):
+            if self.exclusive == 'flow':
+                m = len(self._steps(E)[0])
+                obj = np.concatenate((np.zeros(m), np.ones(m)))
+            else:
+                obj = np.ones(len(E))
+            self._excl.append(self.model.add_vars(obj))
+        return self._excl
+
+    def _add_exclusive_constrs(self):
+        # s_j >= u_j - u_{j-1} within a run: a block starts wherever an
+        # exclusive stretch does, so the starts count the exclusive blocks
+        if self.exclusive != 'flow': return
+        for E, cols in zip((self.E1, self.E2), self._excl):
+            P, first = self._steps(E)
+            m = len(P)
+            r = np.arange(m)
+            prev = np.flatnonzero(~first)
+            A = sp.csr_matrix(
+                (np.concatenate((np.ones(m), -np.ones(m), -np.ones(len(prev)))),
+                 (np.concatenate((r, r, prev)),
+                  cols.start + np.concatenate((r, m + r, prev - 1)))),
+                shape=(m, self.model.num_vars))
+            self.model.add_constrs(A, '<', np.zeros(m))
+
+    def _exclusive_start(self, E, free):
+        # starting values of one exclusive group, covering the positions of
+        # the string still free and marking them as covered
+        if self.exclusive != 'flow':
+            return greedy_exclusive(E, free)
+        P, first = self._steps(E)
+        u = free[P]
+        free[P] = False
+        return np.concatenate((u, u & (first | ~np.r_[False, u[:-1]])))
+
     @abc.abstractmethod
     def _add_variables(self):
        pass
@@ -35,14 +231,149 @@ class BaseILP(abc.ABC):
     def _add_objective(self):
         pass
 
+    @abc.abstractmethod
+    def _start(self):
+        pass
+
+    @abc.abstractmethod
+    def _mapping(self):
+        pass
+
+    @abc.abstractmethod
+    def _restore(self, keys, mapping):
+        pass
+
+    def _settings(self):
+        # everything besides the instance that changes the built model
+        return (type(self).__name__, self.balanced, self.mod, self.exclusive,
+                self.warm_start, self.presolve,
+                self.cliques if self.cliques != 'lazy' else None)
+
+    def _load_model(self, data):
+        self.model = self.backend(
+            '(Reverse) Common Minimum String Partition Program', self.limit,
+            self.threads)
+        self.model.add_vars(data['obj'])
+        self.model.const = float(data['const'])
+        A = sp.csr_matrix((data['data'], data['indices'], data['indptr']),
+                          shape=tuple(data['shape']))
+        sense, rhs = data['sense'], data['rhs']
+        cuts = np.flatnonzero(sense[1:] != sense[:-1]) + 1
+        for a, b in zip(np.r_[0, cuts], np.r_[cuts, len(sense)]):
+            self.model.add_constrs(A[a:b], str(sense[a]), rhs[a:b])
+        if 'start' in data:
+            self.model.set_start(data['start'])
+        if 'fixed' in data:
+            self.reduction = Reduction(data['fixed'], None, dict())
+        self._restore(data['keys'], {name[4:]: value
+                                     for name, value in data.items()
+                                     if name.startswith('map_')})
+        self.stats.update(data['stats'])
+
+    def _build(self):
+        self.model = self.backend(
+            '(Reverse) Common Minimum String Partition Program', self.limit,
+            self.threads)
+
+        with self.profile.phase('variables'):
+            self._add_variables()
+        with self.profile.phase('constraints'):
+            self._add_constraints()
+        with self.profile.phase('objective'):
+            self._add_objective()
+        if self.warm_start:
+            with self.profile.phase('start'):
+                self.model.set_start(self._start())
+        if self.presolve:
+            with self.profile.phase('presolve'):
+                self.reduction = presolve(self.model)
+            self.stats.update((f'presolve_{stat}', value)
+                              for stat, value in self.reduction.stats.items())
+        if self.cliques and self.cliques != 'lazy':
+            with self.profile.phase('cliques'):
+                self._add_cliques()
+
     def formulate(self):
-        self.model = gp.Model('(Reverse) Common Minimum String Partition Program')
-        self.model.Params.TimeLimit = self.limit
-        self.model.Params.Threads = 1
+        # a cached model, looked up by _setup, skips the whole build, colgen
+        # and presolve included
+        key, data = self._model_key, self._cached
+        self._cached = None
+        if data is not None:
+            with self.profile.phase('model_cache'):
+                self._load_model(data)
+        else:
+            self._build()
+            if key:
+                keys, mapping = self._mapping()
+                with self.profile.phase('model_cache'):
+                    self.model_cache.store(key, self.model, keys, mapping,
+                                           self.reduction, self.stats)
+        if self.model_cache:
+            self.stats['model_cache'] = 'hit' if data is not None else 'miss'
+
+        # 'root' cuts are part of the build, 'lazy' ones are separated in
+        # the solver callback where the backend has one
+        if self.cliques == 'lazy':
+            if self.model.cut_callback and self.bound != 'only':
+                if (res := self.model.relaxation()) is not None:
+                    self.stats['lp_bd'] = res[0]
+                self.model.separator = CliqueSeparator(self.model)
+            else:
+                with self.profile.phase('cliques'):
+                    self._add_cliques()
+        self.profile.count('vars', self.model.num_vars)
+        self.profile.count('constraints',
+                           sum(A.shape[0] for A, _, _ in self.model.rows))
+        self.profile.count('nnz', sum(A.nnz for A, _, _ in self.model.rows))
+
+    @abc.abstractmethod
+    def _coverage(self, nB):
+        pass
+
+    def _combinatorial_bound(self):
+        # an adjacency that no block covers is a breakpoint of every
+        # partition, and the objective counts at least the blocks of either
+        # string
+        parts = []
+        for nB in (1, 2):
+            C = self._coverage(nB)
+            inner = C[:-1].multiply(C[1:]).tocsr().getnnz(axis=1) > 0
+            if self.exclusive == 'flow':
+                # step columns cover one position, but consecutive steps
+                # make up a single exclusive block
+                P, first = self._steps(self.E1 if nB == 1 else self.E2)
+                inner[P[~first] - 1] = True
+            parts.append(1 + int((~inner).sum()))
+        return max(parts)
+
+    def _add_cliques(self, rounds=10):
+        # rounds of clique cuts against the LP relaxation, added to the model
+        # as rows before it reaches the solver
+        if (res := self.model.relaxation()) is None: return
+        lp, x, _ = res
+        self.stats['lp_bd'] = lp
+        separator = CliqueSeparator(self.model)
+        for _ in range(rounds):
+            C = separator(x)
+            if not C.shape[0]: break
+            self.model.add_constrs(C, '<', np.ones(C.shape[0]))
+            lp, x, _ = self.model.relaxation()
+        self.stats['clique_cuts'] = len(separator.seen)
+        self.stats['clique_lp_bd'] = lp
+        self.stats['clique_gain'] = lp - self.stats['lp_bd']
 
-        self._add_variables()        
-        self._add_constraints()
-        self._add_objective()
+    def lower_bound(self):
+        # LP relaxation of the formulated model, with the clique cuts if any,
+        # against the combinatorial bound
+        comb = self._combinatorial_bound()
+        if 'clique_lp_bd' in self.stats:
+            lp = self.stats['clique_lp_bd']
+        elif (res := self.model.relaxation()) is None:
+            return float('inf')
+        else:
+            lp = self.stats['lp_bd'] = res[0]
+        self.stats['comb_bd'] = comb
+        return max(comb, math.ceil(lp - EPS))
 
     @abc.abstractmethod
     def _parse_solution(self):
@@ -50,36 +381,118 @@ class BaseILP(abc.ABC):
 
     def optimize(self):
         self.watcher = Watcher(float('inf'), lambda x, y: x < y)
-        try:
-            self.model.optimize(self.watcher.callback)
-            self._parse_solution()
-        except gp.GurobiError as e:
-            print('Error code ' + str(e.errno) + ': ' + str(e))
-        except AttributeError:
-            print('Encountered an attribute error')
+        parts = []
+        if self.decompose:
+            with self.profile.phase('decompose'):
+                components, parts = split(self.model)
+            self.stats['components'] = components
+            self.stats['component_cols'] = [sub.num_vars for _, sub in parts]
+        with self.profile.phase('optimize'):
+            if not self.model.num_vars:
+                self.model.optimize_empty(self.watcher)
+            elif len(parts) > 1:
+                solve(self.model, parts, self.watcher, self.workers)
+            else:
+                self.model.optimize(self.watcher)
+        if self.model.separator is not None:
+            self.stats['clique_cuts'] = len(self.model.separator.seen)
+            if self.model.root_bound is not None:
+                self.stats['root_bd'] = self.model.root_bound
+                if 'lp_bd' in self.stats:
+                    self.stats['root_gain'] = (self.model.root_bound -
+                                               self.stats['lp_bd'])
+        if self.model.target is not None and \
+           self.model.bound < self.model.target:
+            self.model.bound = float(self.model.target)
+            if self.watcher.first_found:
+                sol = self.watcher.last_sol
+                self.model.gap = abs(sol - self.model.bound) / max(abs(sol),
+                                                                   1e-10)
+        if self.model.X is not None:
+            with self.profile.phase('parse_solution'):
+                if self.reduction:
+                    self.model.X = self.reduction.expand(self.model.X)
+                self._parse_solution()
 
     def log_solution(self):
         for (t,k) in self.sol:
             print(f'Block {t} at {k}')
 
-    def log_stats(self):
+    def _emit(self, result):
+        # the statistics block of the log, kept for record()
+        self.result = result
         print('### ESTATISTICAS')
-        print(f'runtime: {self.model.Runtime}')
-        print(f'first_sol: {self.watcher.first_sol}')
-        print(f'first_time: {self.watcher.first_time}')
-        print(f'last_sol: {self.watcher.last_sol}')
-        print(f'last_time: {self.watcher.last_time}')
-        print(f'gap: {self.model.MIPGap}')
-        print(f'best_bd: {self.model.ObjBoundC}')
+        for stat, value in result.items():
+            print(f'{stat}: {value}')
+
+    def log_stats(self):
+        result = {'runtime': self.model.runtime,
+                  'first_sol': self.watcher.first_sol,
+                  'first_time': self.watcher.first_time,
+                  'last_sol': self.watcher.last_sol,
+                  'last_time': self.watcher.last_time,
+                  'gap': self.model.gap,
+                  'best_bd': self.model.bound}
+        if self.warm_start:
+            result['start_accepted'] = self.watcher.start_accepted
+            result['start_sol'] = self.watcher.start_sol
+        self._emit({**result, **self.stats, **self.profile.stats()})
 
     def _log_stats_dummy(self, stats):
-        print('### ESTATISTICAS')
-        for stat in ('runtime','first_sol','first_time','last_sol','last_time',
-                     'gap','best_bd'):
-            print(f'{stat}: {stats.get(stat, 0)}')
+        self._emit({**{stat: stats.get(stat, 0)
+                       for stat in ('runtime','first_sol','first_time',
+                                    'last_sol','last_time','gap','best_bd')},
+                    **self.profile.stats()})
 
-    def run(self):
-        self.formulate()
+    def log_bound(self, stats):
+        self._emit({'runtime': stats['runtime'], 'best_bd': stats['best_bd'],
+                    **self.stats, **self.profile.stats()})
+
+    def log_oom(self):
+        self._emit({'status': 'OOM-guard', 'oom_stage': self.oom,
+                    'memory_cap': self.memory_cap, 'peak_rss': peak_rss(),
+                    **self.stats, **self.profile.stats()})
+
+    def record(self):
+        # one flat row of the structured results: the formulation, its flags
+        # and the statistics block of the log
+        return {'formulation': type(self).__name__,
+                'len1': len(self.l1), 'len2': len(self.l2),
+                'compare': getattr(self.compare, '__name__',
+                                   type(self.compare).__name__),
+                'reverse': self.reverse, 'signaled': self.signaled,
+                'intergenic': bool(self.intergenic),
+                'balanced': self.balanced, 'mod': self.mod,
+                'backend': next(name for name, backend in BACKENDS.items()
+                                if backend is self.backend),
+                'limit': self.limit, 'threads': self.threads,
+                'warm_start': self.warm_start, 'presolve': self.presolve,
+                'bound': self.bound, 'cliques': self.cliques,
+                'decompose': self.decompose, 'exclusive': self.exclusive,
+                **self.result}
+
+    def _run(self):
+        t = default_timer()
+        self.stage = 'formulate'
+        with self.profile.phase('formulate'):
+            self.formulate()
+        self.stage = 'lower_bound'
+        if self.bound == 'only':
+            with self.profile.phase('lower_bound'):
+                best = self.lower_bound()
+            self.log_bound({'runtime': default_timer() - t, 'best_bd': best})
+            return
+        if self.bound == 'stop':
+            with self.profile.phase('lower_bound'):
+                self.model.target = self.lower_bound()
+        self.stage = 'optimize'
         self.optimize()
         self.log_solution()
-        self.log_stats()
\ No newline at end of file
+        self.log_stats()
+
+    def run(self):
+        if self.oom is None:
+            with self._guard():
+                self._run()
+        if self.oom is not None:
+            self.log_oom()
\ No newline at end of file
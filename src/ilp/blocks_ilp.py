@@ -1,59 +1,61 @@
-import gurobipy as gp
-from gurobipy import GRB
+import numpy as np
+import scipy.sparse as sp
 
 from .base_ilp import BaseILP, EPS
-from ..utils.inter import (find_substrings2, substrings_to_blocks, compare,
-                           get_abundant_chars, get_exclusive_blocks)
+from ..utils.greedy import greedy_blocks
+from ..utils.inter import compare
+from ..utils.table import BlockTable, coverage
 
 
 class Block_ILP(BaseILP):
     def __init__(self, l1, l2, compare, reverse, signaled, balanced, mod,
-                 intergenic=False, i1=None, i2=None, limit=3600):
-        super().__init__(l1,l2,compare,reverse,signaled,intergenic,i1,i2,limit)
+                 intergenic=False, i1=None, i2=None, limit=3600, cache=None,
+                 workers=1, blocks=None, backend='gurobi', warm_start=False,
+                 presolve=False, bound=None, cliques=False,
+                 decompose=False, exclusive='blocks', model_cache=None,
+                 threads=1, profile=False, memory_cap=None):
+        super().__init__(l1, l2, compare, reverse, signaled, intergenic,
+                         i1=i1, i2=i2, limit=limit, cache=cache,
+                         workers=workers, blocks=blocks, backend=backend,
+                         warm_start=warm_start, presolve=presolve,
+                         bound=bound, cliques=cliques, decompose=decompose,
+                         exclusive=exclusive, model_cache=model_cache,
+                         threads=threads, profile=profile,
+                         memory_cap=memory_cap)
         self.balanced = balanced
         self.mod = self.balanced and mod
+        self._setup()
 
-        B1, B2 = find_substrings2(self.l1, self.l2, self.i1, self.i2,
-                                 self.compare, self.reverse, self.signaled)
-        self.B = substrings_to_blocks(B1, B2)
-        excl1, excl2 = get_abundant_chars(self.l1, self.l2)
-        self.E1 = get_exclusive_blocks(self.l1, excl1)
-        self.E2 = get_exclusive_blocks(self.l2, excl2)
+    def _prepare(self):
+        B1, B2, self.E1, self.E2 = self._enumerate()
+        with self.profile.phase('block_table'):
+            self.B = BlockTable.from_substrings(self.l1, self.l2, B1, B2)
         if self.mod:
-            self.B = [b for b in self.B if len(b[0]) > 1]
+            self.B = self.B.select(self.B.length > 1)
+
+    def _coverage(self, nB):
+        n = len(self.l1) if nB == 1 else len(self.l2)
+        k = self.B.k1 if nB == 1 else self.B.k2
+        A = [coverage(k, self.B.length, n)]
+        if not self.balanced:
+            A.extend(self._exclusive_coverage(nB, n))
+        return sp.hstack(A, format='csr')
 
     def _add_char_constrs(self,nB):
-        b = nB - 1
-        for j in range(len(self.l1)):
-            expr = sum(
-                self.x[i]
-                for i, (t,*k) in enumerate(self.B)
-                if k[b] <= j < k[b] + len(t[0]))
-            if not self.balanced:
-                E, y = (self.E1, self.y1) if nB == 1 else (self.E2, self.y2)
-                expr += sum(
-                    y[i]
-                    for i, (t, k) in enumerate(E)
-                    if k <= j < k + len(t))
-            self.model.addConstr(expr <= 1 if self.mod else expr == 1,
-                                 f'unicidade de char {j} na str {nB}')
+        A = self._coverage(nB)
+        self.model.add_constrs(A, '<' if self.mod else '=',
+                               np.ones(A.shape[0]))
 
     def _add_variables(self):
-        self.x = []
-        for t, k1, k2 in self.B:
-            self.x.append(
-                self.model.addVar(0, 1, 1, GRB.BINARY))#, f'x_{t}_{k1}_{k2}'))
+        self.x = self.model.add_vars(np.ones(len(self.B)))
         if not self.balanced:
-            self.y1 = []
-            self.y2 = []
-            for t, k in self.E1:
-                self.y1.append(self.model.addVar(0,1,1,GRB.BINARY))#, f'y1_{t}_{k}'))
-            for t, k in self.E2:
-                self.y2.append(self.model.addVar(0,1,1,GRB.BINARY))#, f'y2_{t}_{k}'))
+            self.y1, self.y2 = self._add_exclusive_vars()
 
     def _add_constraints(self):
         self._add_char_constrs(1)
         self._add_char_constrs(2)
+        if not self.balanced:
+            self._add_exclusive_constrs()
 
     def _count_rare_markers(self):
         counts = [{},{}]
@@ -70,21 +72,42 @@ class Block_ILP(BaseILP):
     def _add_objective(self):
         if not self.mod: return
 
-        expr = gp.LinExpr()
-        expr += len(self.l1)
+        obj = np.zeros(self.model.num_vars)
+        obj[self.x] = 1 - self.B.length
+        self.model.set_objective(obj, len(self.l1))
 
-        for (t,_,_), x in zip(self.B,self.x):
-            expr += (1 - len(t)) * x
-        self.model.setObjective(expr, GRB.MINIMIZE)
+    def _start(self):
+        picked, free1, free2 = greedy_blocks(self.B.k1, self.B.k2,
+                                             self.B.length, len(self.l1),
+                                             len(self.l2))
+        start = np.zeros(self.model.num_vars)
+        start[self.x] = picked
+        if not self.balanced:
+            start[self.y1] = self._exclusive_start(self.E1, free1)
+            start[self.y2] = self._exclusive_start(self.E2, free2)
+        if not self.mod and (free1.any() or free2.any()):
+            start[start == 0] = np.nan
+        return start
+
+    def _mapping(self):
+        B = self.B
+        return B.keys, {'x': np.array([self.x.start, self.x.stop]),
+                        'sub': B.sub, 'k1': B.k1, 'k2': B.k2,
+                        'length': B.length, 'orient': B.orient,
+                        'inter': B.inter}
+
+    def _restore(self, keys, mapping):
+        self.x = slice(*mapping.pop('x').tolist())
+        self.B = BlockTable(keys, **mapping)
 
     def _parse_solution(self):
         self.sol = []
-        for i, v in enumerate(self.B):
-            if self.x[i].X > 1 - EPS:
-                self.sol.append((v[0],(v[1],v[2])))
+        for (t, k1, k2), x in zip(self.B, self.model.X[self.x]):
+            if x > 1 - EPS:
+                self.sol.append((t,(k1,k2)))
 
     def run(self):
-        if not self.B:
+        if self.oom is None and not self.cache_hit and not self.B:
             s = self._count_rare_markers()
             print('Only single character blocks found, solution is composed of '
                   f'{s} such blocks')
@@ -0,0 +1,68 @@
+import numpy as np
+import scipy.sparse as sp
+
+from .presolve import set_rows, stack_rows
+
+class CliqueSeparator:
+    # greedy clique cuts on the conflict graph of the model columns: two
+    # columns conflict when they share a set row, i.e. overlap in some
+    # position of either string. Every set row is a clique already; a cut
+    # grows one with the columns that overlap all of its members, possibly
+    # in the other string, up to a maximal clique
+    def __init__(self, model):
+        A, sense, rhs = stack_rows(model)
+        S = A[set_rows(A, sense, rhs)].tocsr()
+        S.eliminate_zeros()
+        S.data[:] = 1
+        self.S = S
+        self.St = S.T.tocsr()
+        self.n = model.num_vars
+        self.seen = set()
+
+    def _lift(self, K, x):
+        # every column conflicting with all of K, support or not, added in
+        # order of LP value while it conflicts with those already added
+        rows = self.St[K[0]].indices
+        cand = np.unique(self.S[rows].indices)
+        full = np.asarray(((self.St[cand] @ self.St[K].T) > 0).sum(axis=1))
+        cand = cand[(full.ravel() == len(K)) & ~np.isin(cand, K)]
+        if not len(cand): return K
+        P = ((self.St[cand] @ self.St[cand].T) > 0).toarray()
+        ok = np.ones(len(cand), dtype=bool)
+        for i in np.lexsort((cand, -x[cand])).tolist():
+            if not ok[i]: continue
+            K.append(int(cand[i]))
+            ok &= P[i]
+            ok[i] = False
+        return K
+
+    def __call__(self, x, eps=1e-6):
+        # cuts violated by the LP point x that were not returned before
+        supp = np.flatnonzero(x > eps)
+        R = self.S[:, supp].tocsr()
+        G = (R.T @ R).toarray() > 0
+        xs = x[supp]
+        order = np.argsort(-xs, kind='stable')
+
+        cuts = []
+        for r in range(R.shape[0]):
+            K = R.indices[R.indptr[r]:R.indptr[r + 1]].tolist()
+            if not K: continue
+            cand = G[K].all(axis=0)
+            cand[K] = False
+            for c in order[cand[order]].tolist():
+                if not cand[c]: continue
+                K.append(c)
+                cand &= G[c]
+                cand[c] = False
+            if xs[K].sum() <= 1 + eps: continue
+            key = tuple(sorted(self._lift(supp[K].tolist(), x)))
+            if key not in self.seen:
+                self.seen.add(key)
+                cuts.append(key)
+
+        indptr = np.cumsum([0] + [len(K) for K in cuts])
+        indices = np.fromiter((i for K in cuts for i in K), dtype=np.int64,
+                              count=indptr[-1])
+        return sp.csr_matrix((np.ones(len(indices)), indices, indptr),
+                             shape=(len(cuts), self.n))
@@ -0,0 +1,93 @@
+from concurrent.futures import ThreadPoolExecutor
+from timeit import default_timer
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
+
+from .presolve import stack_rows
+from .watcher import Watcher
+
+def split(model, min_cols=100):
+    # blocks only interact through the positions they share: every connected
+    # component of the bipartite row/column graph of the model is a sub-ILP
+    # of its own. Small components are packed together so the solver is not
+    # called once per isolated block, and rows without columns ride along
+    # with the largest component
+    A, sense, rhs = stack_rows(model)
+    m, n = A.shape
+    G = sp.bmat([[None, A], [A.T, None]], format='csr')
+    k, labels = connected_components(G, directed=False)
+    rlab, clab = labels[:m], labels[m:]
+
+    sizes = np.bincount(clab, minlength=k)
+    group = np.zeros(k, dtype=np.int64)
+    g = fill = 0
+    for c in np.argsort(-sizes, kind='stable').tolist():
+        if not sizes[c]: break
+        group[c] = g
+        fill += sizes[c]
+        if fill >= min_cols:
+            g, fill = g + 1, 0
+
+    parts = []
+    rg, cg = group[rlab], group[clab]
+    rorder = np.argsort(rg, kind='stable')
+    corder = np.argsort(cg, kind='stable')
+    rsplit = np.searchsorted(rg[rorder], np.arange(1, g + (fill > 0)))
+    csplit = np.searchsorted(cg[corder], np.arange(1, g + (fill > 0)))
+    for i, (rows, cols) in enumerate(zip(np.split(rorder, rsplit),
+                                         np.split(corder, csplit))):
+        sub = type(model)(f'{model.name} [{i}]', model.limit, model.threads)
+        sub.add_vars(model.obj[cols])
+        B = A[rows][:, cols]
+        for s in ('<', '=', '>'):
+            mask = sense[rows] == s
+            if mask.any():
+                sub.add_constrs(B[mask], s, rhs[rows][mask])
+        if model.start is not None:
+            sub.set_start(model.start[cols])
+        parts.append((cols, sub))
+    return k, parts
+
+def solve(model, parts, watcher, workers=1):
+    # solves the parts of split(model) and stitches their solutions back into
+    # model.X; the objective of the whole is the sum of the parts, so an
+    # incumbent only exists once every part has one. A stopping target on
+    # the whole does not carry over to the parts
+    t0 = default_timer()
+
+    def run(part):
+        _, sub = part
+        offset = default_timer() - t0
+        if workers == 1:
+            sub.limit = max(model.limit - offset, 0)
+        w = Watcher(float('inf'), watcher.comp)
+        sub.optimize(w)
+        return offset, w
+
+    with ThreadPoolExecutor(workers) as pool:
+        results = list(pool.map(run, parts))
+    model.runtime = default_timer() - t0
+    # a part without a feasible solution makes the whole infeasible
+    bounds = [sub.bound for _, sub in parts]
+    model.bound = model.const + (max(bounds) if max(bounds) == float('inf')
+                                 else sum(bounds))
+    watcher.update_bound(model.bound)
+
+    found = [w for _, w in results if w.first_found]
+    if len(found) == len(parts):
+        watcher.update(model.const + sum(w.first_sol for _, w in results),
+                       max(o + w.first_time for o, w in results))
+        watcher.update(model.const + sum(w.last_sol for _, w in results),
+                       max(o + w.last_time for o, w in results))
+    if model.start is not None and all(w.start_accepted for _, w in results):
+        watcher.update_start(model.const +
+                             sum(w.start_sol for _, w in results))
+
+    if all(sub.X is not None for _, sub in parts):
+        model.X = np.zeros(model.num_vars)
+        for cols, sub in parts:
+            model.X[cols] = sub.X
+        obj = model.obj @ model.X + model.const
+        model.gap = abs(obj - model.bound) / max(abs(obj), 1e-10)
@@ -0,0 +1,116 @@
+import numpy as np
+import scipy.sparse as sp
+
+def _duplicates(M):
+    # indices of rows of a CSR matrix that repeat an earlier row
+    M.sort_indices()
+    seen = dict()
+    dup = []
+    for r in range(M.shape[0]):
+        a, b = M.indptr[r], M.indptr[r + 1]
+        key = (M.indices[a:b].tobytes(), M.data[a:b].tobytes())
+        if seen.setdefault(key, r) != r:
+            dup.append(r)
+    return np.array(dup, dtype=np.int64)
+
+def stack_rows(model):
+    # every row of a Backend model as one matrix, with its sense and rhs
+    if not model.rows:
+        return (sp.csr_matrix((0, model.num_vars)), np.empty(0, dtype='<U1'),
+                np.empty(0))
+    A = sp.vstack([A for A, _, _ in model.rows], format='csr')
+    sense = np.concatenate([np.full(A.shape[0], s) for A, s, _ in model.rows])
+    rhs = np.concatenate([rhs for _, _, rhs in model.rows])
+    return A, sense, rhs
+
+def set_rows(A, sense, rhs):
+    # rows of the form sum(x) <= 1 or sum(x) = 1, i.e. at most one block
+    # over some position
+    off = sp.csr_matrix(((A.data != 1) & (A.data != 0), A.indices, A.indptr),
+                        shape=A.shape)
+    unit = np.asarray(off.sum(axis=1)).ravel() == 0
+    return unit & (rhs == 1) & (sense != '>')
+
+class Reduction:
+    def __init__(self, values, rows, stats):
+        self.values = values
+        self.rows = rows
+        self.cols = np.flatnonzero(np.isnan(values))
+        self.stats = stats
+
+    def expand(self, X):
+        full = self.values.copy()
+        full[self.cols] = X
+        return full
+
+def presolve(model):
+    # set partitioning reductions on a Backend model, all on 0/1 columns:
+    # - a row that is already covered by a column fixed to 1 fixes every
+    #   other column in it to 0 (one block per position)
+    # - an equality row with a single free column fixes it to 1 (the only
+    #   block left over some position)
+    # - a column with nonnegative cost that only appears in <= rows is never
+    #   needed, and of identical columns only the cheapest is kept
+    # - identical rows, e.g. the positions of a character that occurs once
+    #   in each string, are kept once
+    # set rows are those with unit coefficients and rhs 1; other rows (the
+    # Substring_ILP balance rows) only have their rhs updated. The reduction
+    # may fix every column, which leaves a model the solvers are not called
+    # on (see Backend.optimize_empty)
+    A, sense, rhs = stack_rows(model)
+    n, m = A.shape[1], A.shape[0]
+    stats = {'rows': m, 'cols': n, 'nnz': A.nnz}
+
+    setrow = set_rows(A, sense, rhs)
+    S = A[setrow]
+    S_eq = sense[setrow] == '='
+    At = S.T.tocsr()
+
+    values = np.full(n, np.nan)
+    packing = np.asarray((A[~setrow] != 0).sum(axis=0)).ravel() == 0
+    packing &= np.asarray(At[:, S_eq].sum(axis=1)).ravel() == 0
+    values[packing & (model.obj >= 0)] = 0
+
+    order = np.lexsort((np.arange(n), model.obj))
+    dup = order[_duplicates(A.T.tocsr()[order])]
+    values[dup[np.asarray(At[dup].sum(axis=1)).ravel() > 0]] = 0
+
+    while True:
+        free = np.isnan(values)
+        ones = S @ (values == 1)
+        nfree = S @ free
+        covered = ones > 0
+        zero = free & (At @ covered > 0)
+        force = S_eq & ~covered & (nfree == 1)
+        one = free & ~zero & (At @ force > 0)
+        if not (zero.any() or one.any()): break
+        values[zero] = 0
+        values[one] = 1
+
+    stats['fixed_1'] = int((values == 1).sum())
+    stats['fixed_0'] = int((values == 0).sum())
+    fixed = ~np.isnan(values)
+    rhs = rhs - A[:, fixed] @ values[fixed]
+    # rows left without free columns are dropped unless violated, so that
+    # the solver still reports an infeasible reduction
+    keep = np.asarray((A[:, ~fixed] != 0).sum(axis=1)).ravel() > 0
+    keep |= np.where(sense == '<', rhs < 0, np.where(sense == '>', rhs > 0,
+                                                     rhs != 0))
+    # identical rows only matter within the same sense and rhs
+    R = sp.hstack([A[:, ~fixed], sp.csr_matrix(np.c_[
+        np.unique(sense, return_inverse=True)[1], rhs])], format='csr')
+    keep[np.flatnonzero(keep)[_duplicates(R[keep])]] = False
+
+    reduction = Reduction(values, np.flatnonzero(keep), stats)
+    cols = reduction.cols
+    model.const += model.obj[fixed] @ values[fixed]
+    model.obj = model.obj[cols]
+    model.rows = [(A[keep][:, cols][sense[keep] == s], s,
+                   rhs[keep][sense[keep] == s])
+                  for s in ('<', '=', '>') if (sense[keep] == s).any()]
+    if model.start is not None:
+        model.start = model.start[cols]
+    stats['rows'] = f'{keep.sum()}/{m}'
+    stats['cols'] = f'{len(cols)}/{n}'
+    stats['nnz'] = f'{sum(B.nnz for B, _, _ in model.rows)}/{stats["nnz"]}'
+    return reduction
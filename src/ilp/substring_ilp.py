@@ -1,74 +1,97 @@
-import gurobipy as gp
-from gurobipy import GRB
+import math
+
+import numpy as np
+import scipy.sparse as sp
 
 from .base_ilp import BaseILP, EPS
-from ..utils.inter import (compare, find_substrings2, get_abundant_chars,
-                           get_exclusive_blocks)
+from ..utils.inter import compare
+from ..utils.table import coverage, flatten
 
 
 class Substring_ILP(BaseILP):
     def __init__(self, l1, l2, compare, reverse, signaled, balanced, mod,
-                 intergenic=False, i1=None, i2=None, limit=3600):
-        super().__init__(l1,l2,compare,reverse,signaled,intergenic,i1,i2,limit)
+                 intergenic=False, i1=None, i2=None, limit=3600, cache=None,
+                 workers=1, blocks=None, backend='gurobi', warm_start=False,
+                 presolve=False, bound=None, cliques=False,
+                 decompose=False, exclusive='blocks', model_cache=None,
+                 threads=1, profile=False, memory_cap=None, colgen=False):
+        super().__init__(l1, l2, compare, reverse, signaled, intergenic,
+                         i1=i1, i2=i2, limit=limit, cache=cache,
+                         workers=workers, blocks=blocks, backend=backend,
+                         warm_start=warm_start, presolve=presolve,
+                         bound=bound, cliques=cliques, decompose=decompose,
+                         exclusive=exclusive, model_cache=model_cache,
+                         threads=threads, profile=profile,
+                         memory_cap=memory_cap)
         self.balanced = balanced
         self.mod = self.balanced and mod
+        self.colgen = colgen
+        self._setup()
 
-        self.B1, self.B2 = find_substrings2(self.l1, self.l2,self.i1, self.i2, self.compare,
-                                        self.reverse, self.signaled)
-        excl1, excl2 = get_abundant_chars(self.l1, self.l2)
-        self.E1 = get_exclusive_blocks(self.l1, excl1)
-        self.E2 = get_exclusive_blocks(self.l2, excl2)
+    def _prepare(self):
+        self.B1, self.B2, self.E1, self.E2 = self._enumerate()
         if self.mod:
-            self.B1 = {t:ks for t,ks in self.B1.items() if len(t) > 1}
-            self.B2 = {t:ks for t,ks in self.B2.items() if len(t) > 1}
-
-    def _add_vars(self, B, nB):
-        y = dict()
-        for t, ks in B.items():
-            y[t] = dict()
-            for k in ks:
-                y[t][k] = self.model.addVar(
-                    0,1,1 if nB == 1 else 0,GRB.BINARY)#,f'y{nB}_{t}_{k}')
-        return y
-    
-    def _add_exclusive_vars(self):
+            self.B1 = {t:ks for t,ks in self.B1.items() if len(t[0]) > 1}
+            self.B2 = {t:ks for t,ks in self.B2.items() if len(t[0]) > 1}
+
+        self.keys = list(self.B1)
+        self.k1, self.n1, self.off1 = flatten([self.B1[t] for t in self.keys])
+        self.k2, self.n2, self.off2 = flatten([self.B2[t] for t in self.keys])
+        self.sub1 = np.repeat(np.arange(len(self.keys)), self.n1)
+        self.sub2 = np.repeat(np.arange(len(self.keys)), self.n2)
+        self.length = np.fromiter((len(t) for t, _ in self.keys),
+                                  dtype=np.int64, count=len(self.keys))
+        # every occurrence; k1/sub1 and k2/sub2 only keep the active ones
+        # when columns are generated
+        self._occ1 = (self.k1, self.sub1)
+        self._occ2 = (self.k2, self.sub2)
+        self.act1 = np.ones(len(self.k1), dtype=bool)
+        self.act2 = np.ones(len(self.k2), dtype=bool)
+
+    def _coverage(self, nB):
+        n = len(self.l1) if nB == 1 else len(self.l2)
+        k, sub = (self.k1, self.sub1) if nB == 1 else (self.k2, self.sub2)
+        cov = coverage(k, self.length[sub], n)
+        pad = sp.csr_matrix((n, len(self.k2 if nB == 1 else self.k1)))
+        A = [cov, pad] if nB == 1 else [pad, cov]
         if not self.balanced:
-            self.x1 = []
-            self.x2 = []
-            for t, k in self.E1:
-                self.x1.append(self.model.addVar(0,1,1,GRB.BINARY))#, f'x1_{t}_{k}'))
-            for t, k in self.E2:
-                self.x2.append(self.model.addVar(0,1,1,GRB.BINARY))#, f'x2_{t}_{k}'))
-
-    def _add_char_constrs(self,B,y,nB):
-        for j in range(len(self.l1)):
-            expr = sum(
-                sum(y[t][k]
-                    for k in ks
-                    if k <= j < k + len(t[0]))
-                for t, ks in B.items())
-            if not self.balanced:
-                E, x = (self.E1, self.x1) if nB == 1 else (self.E2, self.x2)
-                expr += sum(
-                    x[i]
-                    for i, (t, k) in enumerate(E)
-                    if k <= j < k + len(t))
-            self.model.addConstr(
-                expr <= 1 if self.mod else expr == 1,
-                f'unicidade de char {j} na str {nB}')
+            A.extend(self._exclusive_coverage(nB, n))
+        return sp.hstack(A, format='csr')
+
+    def _combinatorial_bound(self):
+        # over every occurrence, not only the generated columns
+        kept = self.k1, self.sub1, self.k2, self.sub2
+        (self.k1, self.sub1), (self.k2, self.sub2) = self._occ1, self._occ2
+        try:
+            return super()._combinatorial_bound()
+        finally:
+            self.k1, self.sub1, self.k2, self.sub2 = kept
+
+    def _balance(self):
+        n1, n2 = len(self.k1), len(self.k2)
+        rows = np.concatenate((self.sub1, self.sub2))
+        cols = np.arange(n1 + n2)
+        vals = np.concatenate((np.ones(n1), -np.ones(n2)))
+        return sp.csr_matrix((vals, (rows, cols)),
+                             shape=(len(self.keys), self.model.num_vars))
+
+    def _add_char_constrs(self,nB):
+        A = self._coverage(nB)
+        self.model.add_constrs(A, '<' if self.mod else '=',
+                               np.ones(A.shape[0]))
 
     def _add_variables(self):
-        self.y1 = self._add_vars(self.B1, 1)
-        self.y2 = self._add_vars(self.B2, 2)
-        self._add_exclusive_vars()
+        self.y1 = self.model.add_vars(np.ones(len(self.k1)))
+        self.y2 = self.model.add_vars(np.zeros(len(self.k2)))
+        if not self.balanced:
+            self.x1, self.x2 = self._add_exclusive_vars()
 
     def _add_constraints(self):
-        self._add_char_constrs(self.B1,self.y1,1)
-        self._add_char_constrs(self.B2,self.y2,2)
-
-        for t in self.B1:
-            self.model.addConstr(
-                sum(self.y1[t].values()) == sum(self.y2[t].values()))
+        self._add_char_constrs(1)
+        self._add_char_constrs(2)
+        self.model.add_constrs(self._balance(), '=', np.zeros(len(self.keys)))
+        if not self.balanced:
+            self._add_exclusive_constrs()
 
     def _count_rare_markers(self):
         counts = [{},{}]
@@ -85,26 +108,166 @@ class Substring_ILP(BaseILP):
     def _add_objective(self):
         if not self.mod: return
 
-        expr = gp.LinExpr()
-        if self.balanced:
-            expr += len(self.l1)
-        else:
-            expr += self._count_rare_markers()
+        const = len(self.l1) if self.balanced else self._count_rare_markers()
+        obj = np.zeros(self.model.num_vars)
+        obj[self.y1] = 1 - self.length[self.sub1]
+        self.model.set_objective(obj, const)
+
+    def _greedy(self):
+        # longest-first greedy over (k1, k2) occurrence pairs, as in
+        # greedy_blocks but without expanding the pairs into a table
+        free1 = np.ones(len(self.l1), dtype=bool)
+        free2 = np.ones(len(self.l2), dtype=bool)
+        k1, k2 = self._occ1[0], self._occ2[0]
+        pick1, pick2 = [], []
+        for s in np.argsort(-self.length, kind='stable').tolist():
+            L = int(self.length[s])
+            b, end = int(self.off2[s]), int(self.off2[s] + self.n2[s])
+            for a in range(self.off1[s], self.off1[s] + self.n1[s]):
+                k = k1[a]
+                if not free1[k:k + L].all(): continue
+                while b < end and not free2[k2[b]:k2[b] + L].all():
+                    b += 1
+                if b == end: break
+                free1[k:k + L] = False
+                free2[k2[b]:k2[b] + L] = False
+                pick1.append(a)
+                pick2.append(b)
+        return np.array(pick1, dtype=np.int64), \
+               np.array(pick2, dtype=np.int64), free1, free2
+
+    def _start(self):
+        pick1, pick2, free1, free2 = self._greedy()
+        start = np.zeros(self.model.num_vars)
+        start[self.y1.start + np.cumsum(self.act1)[pick1] - 1] = 1
+        start[self.y2.start + np.cumsum(self.act2)[pick2] - 1] = 1
+        if not self.balanced:
+            start[self.x1] = self._exclusive_start(self.E1, free1)
+            start[self.x2] = self._exclusive_start(self.E2, free2)
+        if not self.mod and (free1.any() or free2.any()):
+            start[start == 0] = np.nan
+        return start
+
+    def _restrict(self, act1, act2):
+        self.act1, self.act2 = act1, act2
+        self.k1, self.sub1 = self._occ1[0][act1], self._occ1[1][act1]
+        self.k2, self.sub2 = self._occ2[0][act2], self._occ2[1][act2]
+
+    def _price(self, k, sub, c, pi, mu):
+        # reduced costs of every occurrence against the row duals, with
+        # prefix sums of pi giving the dual weight of each covered interval
+        P = np.concatenate(([0], np.cumsum(pi)))
+        w = c - (P[k + self.length[sub]] - P[k])
+        return w, w - mu[sub]
+
+    def _generate_columns(self, max_iter=100, eps=1e-6):
+        # price-and-branch: the LP relaxation is solved by column generation
+        # over the occurrences, starting from the single characters and the
+        # greedy partition, and the MIP is then built from the generated
+        # columns only. The LP bounds the whole model once no column prices
+        # out; stopped at max_iter before that, it bounds nothing
+        act1 = self.length[self._occ1[1]] == 1
+        act2 = self.length[self._occ2[1]] == 1
+        pick1, pick2, _, _ = self._greedy()
+        act1[pick1] = act2[pick2] = True
+
+        c1 = 1 - self.length[self._occ1[1]] if self.mod else np.ones(len(act1))
+        n1, n2, K = len(self.l1), len(self.l2), len(self.keys)
+        batch = n1 + n2
+        converged = False
+        for it in range(1, max_iter + 1):
+            self._restrict(act1, act2)
+            self.model = self.backend('master', self.limit, self.threads)
+            self._add_variables()
+            self._add_constraints()
+            self._add_objective()
+            lp, _, y = self.model.relaxation(penalty=n1 + n2)
+            pi1, pi2, mu = y[:n1], y[n1:n1 + n2], y[n1 + n2:n1 + n2 + K]
+
+            w1, rc1 = self._price(*self._occ1, c1, pi1, mu)
+            w2, rc2 = self._price(*self._occ2, 0, pi2, -mu)
+            keyact = np.zeros(K, dtype=bool)
+            keyact[self._occ1[1][act1]] = True
+
+            # a key outside the master enters with its best pair of
+            # occurrences, its balance dual being free to cancel out
+            best = []
+            for w, (_, sub) in ((w1, self._occ1), (w2, self._occ2)):
+                o = np.lexsort((w, sub))
+                o = o[np.r_[True, sub[o][1:] != sub[o][:-1]]]
+                best.append(o)
+            new = ~keyact & (w1[best[0]] + w2[best[1]] < -eps)
+
+            cand1 = np.flatnonzero(~act1 & keyact[self._occ1[1]] & (rc1 < -eps))
+            cand2 = np.flatnonzero(~act2 & keyact[self._occ2[1]] & (rc2 < -eps))
+            cand1 = cand1[np.argsort(rc1[cand1])[:batch]]
+            cand2 = cand2[np.argsort(rc2[cand2])[:batch]]
+            if not (new.any() or len(cand1) or len(cand2)):
+                converged = True
+                break
+            act1[cand1] = act2[cand2] = True
+            act1[best[0][new]] = act2[best[1][new]] = True
+
+        self._restrict(act1, act2)
+        self.stats['colgen_iterations'] = it
+        self.stats['colgen_columns'] = (f'{act1.sum() + act2.sum()}/'
+                                        f'{len(act1) + len(act2)}')
+        self.stats['colgen_converged'] = converged
+        self.stats['colgen_lp_bound'] = lp if converged else None
+
+    def lower_bound(self):
+        # the restricted master only bounds itself, so with colgen the LP is
+        # the one priced over every occurrence, if it converged
+        if not self.colgen: return super().lower_bound()
+        comb = self.stats['comb_bd'] = self._combinatorial_bound()
+        lp = self.stats.get('colgen_lp_bound')
+        return comb if lp is None else max(comb, math.ceil(lp - EPS))
+
+    def optimize(self):
+        super().optimize()
+        if not self.colgen: return
+        # likewise the bound of the MIP over the generated columns, and the
+        # gap taken from it, hold for those columns only
+        lp = self.stats.get('colgen_lp_bound')
+        self.model.bound = None if lp is None else self.lower_bound()
+        self.model.gap = None
+        if self.model.bound is not None and self.watcher.first_found:
+            sol = self.watcher.last_sol
+            self.model.gap = abs(sol - self.model.bound) / max(abs(sol), 1e-10)
+
+    def _build(self):
+        if self.colgen:
+            with self.profile.phase('colgen'):
+                self._generate_columns()
+        super()._build()
+
+    def _settings(self):
+        return super()._settings() + (self.colgen,)
+
+    def _needs_instance(self):
+        # the bounds of the generated columns are priced over every
+        # occurrence
+        return self.colgen or super()._needs_instance()
+
+    def record(self):
+        return {'colgen': self.colgen, **super().record()}
+
+    def _mapping(self):
+        return self.keys, {'y1': np.array([self.y1.start, self.y1.stop]),
+                           'sub1': self.sub1, 'k1': self.k1}
 
-        for t, ks in self.y1.items():
-            for _, yk in ks.items():
-                expr += (1 - len(t)) * yk
-        self.model.setObjective(expr, GRB.MINIMIZE)
+    def _restore(self, keys, mapping):
+        self.keys = keys
+        self.y1 = slice(*mapping['y1'].tolist())
+        self.sub1, self.k1 = mapping['sub1'], mapping['k1']
 
     def _parse_solution(self):
         self.sol = []
-        for t, ks in self.B1.items():
-            for k in ks:
-                if self.y1[t][k].X > 1 - EPS:
-                    self.sol.append((t,k))
+        for i in np.flatnonzero(self.model.X[self.y1] > 1 - EPS):
+            self.sol.append((self.keys[self.sub1[i]], int(self.k1[i])))
 
     def run(self):
-        if not self.B1:
+        if self.oom is None and not self.cache_hit and not self.B1:
             s = self._count_rare_markers()
             print('Only single character blocks found, solution is composed of '
                   f'{s} such blocks')
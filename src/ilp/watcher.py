@@ -1,22 +1,26 @@
-import gurobipy as gp
-from gurobipy import GRB
-
 class Watcher:
     def __init__(self, init_sol, comp):
         self.first_sol = self.last_sol = init_sol
         self.first_time = self.last_time = 0
         self.first_found = False
+        self.bound = None
+        self.start_sol = None
+        self.start_accepted = False
         self.comp = comp
 
-    def callback(self, model: gp.Model, where: int) -> None:
-        if where != GRB.Callback.MIPSOL: return
-
+    def update(self, obj, time):
         if not self.first_found:
-            self.first_sol = model.cbGet(GRB.Callback.MIPSOL_OBJ)
-            self.first_time = model.cbGet(GRB.Callback.RUNTIME)
+            self.first_sol = obj
+            self.first_time = time
             self.first_found = True
-        
-        if self.comp(
-            (obj := model.cbGet(GRB.Callback.MIPSOL_OBJ)), self.last_sol):
+
+        if self.comp(obj, self.last_sol):
             self.last_sol = obj
-            self.last_time = model.cbGet(GRB.Callback.RUNTIME)
+            self.last_time = time
+
+    def update_bound(self, bound):
+        self.bound = bound
+
+    def update_start(self, obj):
+        self.start_sol = obj
+        self.start_accepted = True
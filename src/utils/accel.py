@@ -0,0 +1,109 @@
+import os
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+_enabled = numba is not None and os.environ.get('SPE_NUMBA') == '1'
+_loaded = [None, None, None]
+
+def enable(flag=True):
+    global _enabled
+    if flag and numba is None:
+        raise ImportError('numba is required for the accelerated kernels')
+    _enabled = flag
+
+def enabled():
+    return _enabled
+
+def _jit(f):
+    return numba.njit(cache=True)(f) if numba else f
+
+@_jit
+def compare(l1, l2, reverse):
+    dir_comp = True
+    rev_comp = reverse
+    for i in range(len(l1)):
+        dir_comp = dir_comp and l1[i] == l2[i]
+        rev_comp = rev_comp and l1[i] == l2[-i-1]
+        if not (dir_comp or rev_comp): return False
+    return True
+
+@_jit
+def signaled_compare(l1, l2, reverse):
+    dir_comp = True
+    rev_comp = True
+    for i in range(len(l1)):
+        dir_comp = dir_comp and l1[i] == l2[i]
+        if i == len(l2) - i - 1:
+            rev_comp = rev_comp and l1[i] == abs(l2[-i-1])
+        else:
+            rev_comp = rev_comp and l1[i] == -l2[-i-1]
+        if not (dir_comp or rev_comp): return False
+    return True
+
+@_jit
+def find_sub(block, string, signaled, reverse):
+    l_pos = np.empty(max(len(string) - len(block) + 1, 0), dtype=np.int64)
+    n = 0
+    for start in range(len(string) - len(block) + 1):
+        s = string[start:start + len(block)]
+        if (signaled_compare(block, s, reverse) if signaled
+                else compare(block, s, reverse)):
+            l_pos[n] = start
+            n += 1
+    return l_pos[:n]
+
+@_jit
+def _inter_match(block, string, inter_block, lo, hi, start, sign):
+    L = len(block)
+    for k in range(L):
+        c = string[start + k] if sign == 0 else sign * string[start + L - 1 - k]
+        if c != block[k]: return False
+        if k < L - 1:
+            g = start + k if sign == 0 else start + L - 2 - k
+            if not (lo[g] <= inter_block[k] <= hi[g]): return False
+    return True
+
+@_jit
+def find_sub_inter(block, string, inter_block, lo, hi, rev):
+    l_pos = np.empty(max(len(string) - len(block) + 1, 0), dtype=np.int64)
+    n = 0
+    for start in range(len(string) - len(block) + 1):
+        if (_inter_match(block, string, inter_block, lo, hi, start, 0)
+                or (rev != 0 and _inter_match(block, string, inter_block, lo,
+                                              hi, start, rev))):
+            l_pos[n] = start
+            n += 1
+    return l_pos[:n]
+
+def _arrays(string, inter_string=None):
+    # the last strings converted, keyed on their contents so that a list
+    # changed in place is converted again
+    string = tuple(string)
+    if inter_string is not None: inter_string = tuple(inter_string)
+    if _loaded[0] != string or _loaded[1] != inter_string:
+        s = np.asarray(string, dtype=np.int64)
+        if inter_string is None:
+            _loaded[:] = [string, None, (s,)]
+        else:
+            g = np.asarray(inter_string, dtype=np.int64)
+            if g.ndim == 1: g = g[:, None]
+            _loaded[:] = [string, inter_string,
+                          (s, np.ascontiguousarray(g[:, 0]),
+                           np.ascontiguousarray(g[:, -1]))]
+    return _loaded[2]
+
+def blocks_find_sub(block, string, signaled, reverse):
+    s, = _arrays(string)
+    return find_sub(np.asarray(block, dtype=np.int64), s, signaled,
+                    reverse).tolist()
+
+def inter_find_sub(block, string, inter_block, inter_string, rev):
+    s, lo, hi = _arrays(string, inter_string)
+    return find_sub_inter(np.asarray(block, dtype=np.int64), s,
+                          np.asarray(inter_block, dtype=np.int64), lo, hi,
+                          rev).tolist()
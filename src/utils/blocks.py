@@ -1,4 +1,5 @@
-from itertools import product
+from . import accel
+from .fingerprint import Fingerprint
 
 def compare(l1, l2, reverse):
     dir_comp = True
@@ -21,7 +22,12 @@ def signaled_compare(l1, l2, reverse):
         if not (dir_comp or rev_comp): return False
     return True
 
+_ACCEL_MODES = {compare: False, signaled_compare: True}
+
 def find_sub(block, string, compare, reverse):
+    if accel.enabled() and compare in _ACCEL_MODES:
+        return accel.blocks_find_sub(block, string, _ACCEL_MODES[compare],
+                                     reverse)
     l_pos = []
     start = 0
     while start <= len(string) - len(block):
@@ -31,27 +37,26 @@ def find_sub(block, string, compare, reverse):
     return l_pos
 
 def find_substrings(l1, l2, compare, reverse = False, signaled = False):
-    B = set()
+    rev = (lambda x: -x) if signaled else (lambda x: x) if reverse else None
+    fp = Fingerprint(l1, None, rev)
+    keys = dict()
     B1 = dict()
     B2 = dict()
 
     for i in range(len(l1)):
         for j in range(i, len(l1)):
+            # a fingerprint hit is checked against the substring itself
+            h = fp.canonical(i, j - i + 1)
             t = tuple(l1[i:j + 1])
-
-            if t in B:
-                B1[t].append(i)
-                continue
-            elif signaled and (t_ := tuple(-x for x in reversed(t))) in B:
-                B1[t_].append(i)
-                continue
-            elif reverse and (t_ := tuple(reversed(t))) in B:
-                B1[t_].append(i)
+            key = next((k for k in keys.get(h, ()) if k == t or rev and
+                        k == tuple(rev(x) for x in reversed(t))), None)
+            if key is not None:
+                B1[key].append(i)
                 continue
 
             pos = find_sub(t, l2, compare, reverse)
             if pos:
-                B.add(t)
+                keys.setdefault(h, []).append(t)
                 B1[t] = [i]
                 B2[t] = pos
             else:
@@ -59,8 +64,3 @@ def find_substrings(l1, l2, compare, reverse = False, signaled = False):
 
     return (B1, B2)
 
-def substrings_to_blocks(B1, B2):
-    B = []
-    for t in B1:
-        B.extend(product((t,), B1[t], B2[t]))
-    return B
\ No newline at end of file
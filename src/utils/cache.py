@@ -0,0 +1,156 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import scipy.sparse as sp
+
+def _flat(lists):
+    lists = list(lists)
+    return (np.fromiter((x for l in lists for x in l), dtype=np.int64),
+            np.fromiter((len(l) for l in lists), dtype=np.int64))
+
+def _split(flat, sizes):
+    return np.split(flat, np.cumsum(sizes)[:-1]) if len(sizes) else []
+
+def _plain(value):
+    # numpy scalars in the stats, as json numbers
+    return value.item() if hasattr(value, 'item') else str(value)
+
+class BlockCache:
+    # every file of an entry is named after its key; the .npz one is always
+    # there and its mtime orders the LRU eviction
+    suffixes = ('.npz',)
+
+    def __init__(self, directory, max_bytes=1 << 30):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, l1, l2, i1, i2, compare, reverse, signaled):
+        compare = getattr(compare, 'base', compare)
+        h = hashlib.sha256()
+        h.update(f'{compare.__module__}.{compare.__qualname__}'.encode())
+        h.update(bytes((bool(reverse), bool(signaled))))
+        for seq in (l1, l2, i1, i2):
+            a = np.asarray(seq, dtype=np.int64)
+            h.update(str(a.shape).encode())
+            h.update(a.tobytes())
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.npz')
+
+    def load(self, key):
+        path = self._path(key)
+        try:
+            with np.load(path) as f:
+                data = {k: f[k] for k in f.files}
+        except (OSError, ValueError):
+            return None
+        os.utime(path)
+
+        chars = _split(data['chars'], data['lens'])
+        inters = _split(data['inters'], np.maximum(data['lens'] - 1, 0))
+        keys = [(tuple(t.tolist()), tuple(g.tolist()))
+                for t, g in zip(chars, inters)]
+        B1 = {t: k.tolist() for t, k in zip(keys, _split(data['b1'],
+                                                         data['n1']))}
+        B2 = {t: k.tolist() for t, k in zip(keys, _split(data['b2'],
+                                                         data['n2']))}
+        return (B1, B2, data['e1'], data['e2'])
+
+    def store(self, key, B1, B2, E1, E2):
+        chars, lens = _flat([t for t, _ in B1])
+        inters, _ = _flat([g for _, g in B1])
+        b1, n1 = _flat(B1.values())
+        b2, n2 = _flat(B2[t] for t in B1)
+
+        path = self._path(key)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as f:
+            np.savez_compressed(f, chars=chars, lens=lens, inters=inters,
+                                b1=b1, n1=n1, b2=b2, n2=n2, e1=E1, e2=E2)
+        os.replace(tmp, path)
+        self._evict()
+
+    def _evict(self):
+        entries = dict()
+        for name in os.listdir(self.directory):
+            stem, ext = os.path.splitext(name)
+            if ext not in self.suffixes: continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            mtime, size, paths = entries.get(stem, (None, 0, []))
+            if ext == '.npz': mtime = st.st_mtime
+            entries[stem] = (mtime, size + st.st_size, paths + [path])
+
+        total = sum(size for _, size, _ in entries.values())
+        for mtime, size, paths in sorted(entries.values(),
+                                         key=lambda e: e[0] or 0):
+            if total <= self.max_bytes: break
+            for path in paths:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= size
+
+class ModelCache(BlockCache):
+    # formulated models: an MPS file that external solvers can read, and an
+    # .npz sidecar with the same model in matrix form, the arrays mapping
+    # its columns back to blocks, the presolve fixings and the stats of the
+    # formulation. Loading only reads the sidecar, which is much faster than
+    # parsing the MPS back
+    suffixes = ('.npz', '.mps')
+
+    def key(self, l1, l2, i1, i2, compare, reverse, signaled, settings=()):
+        h = hashlib.sha256(super().key(l1, l2, i1, i2, compare, reverse,
+                                       signaled).encode())
+        h.update(repr(tuple(settings)).encode())
+        return h.hexdigest()
+
+    def load(self, key):
+        path = self._path(key)
+        try:
+            with np.load(path) as f:
+                data = {k: f[k] for k in f.files}
+        except (OSError, ValueError):
+            return None
+        os.utime(path)
+
+        chars = _split(data.pop('chars'), data['lens'])
+        inters = _split(data.pop('inters'), np.maximum(data.pop('lens') - 1, 0))
+        data['keys'] = [(tuple(t.tolist()), tuple(g.tolist()))
+                        for t, g in zip(chars, inters)]
+        data['stats'] = json.loads(str(data['stats']))
+        return data
+
+    def store(self, key, model, keys, mapping, reduction, stats):
+        chars, lens = _flat([t for t, _ in keys])
+        inters, _ = _flat([g for _, g in keys])
+        A = sp.vstack([A for A, _, _ in model.rows], format='csr')
+        sense = np.concatenate([np.full(B.shape[0], s)
+                                for B, s, _ in model.rows])
+        rhs = np.concatenate([rhs for _, _, rhs in model.rows])
+        arrays = {f'map_{name}': value for name, value in mapping.items()}
+        if model.start is not None:
+            arrays['start'] = model.start
+        if reduction is not None:
+            arrays['fixed'] = reduction.values
+
+        path = self._path(key)
+        model.write_mps(f'{path[:-4]}.mps')
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as f:
+            np.savez_compressed(f, chars=chars, lens=lens, inters=inters,
+                                obj=model.obj, const=model.const,
+                                data=A.data, indices=A.indices,
+                                indptr=A.indptr, shape=A.shape, sense=sense,
+                                rhs=rhs, stats=json.dumps(stats, default=_plain),
+                                **arrays)
+        os.replace(tmp, path)
+        self._evict()
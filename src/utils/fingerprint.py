@@ -0,0 +1,64 @@
+import random
+
+MOD = (1 << 61) - 1
+SHIFT = 1 << 32
+
+def _interleave(string, inter_string):
+    if inter_string is None: return list(string)
+    seq = []
+    for c, g in zip(string, inter_string):
+        seq.append(c)
+        seq.append(g)
+    seq.append(string[-1])
+    return seq
+
+def _prefix_hashes(seq, base):
+    h = [0]
+    for x in seq:
+        h.append((h[-1] * base + x + SHIFT) % MOD)
+    return h
+
+class Fingerprint:
+    def __init__(self, string, inter_string=None, rev=None, base=None):
+        self.n = len(string)
+        self.stride = 1 if inter_string is None else 2
+        self.base = base or random.randrange(1 << 20, MOD - 1)
+        self.windows = dict()
+        if not string:
+            self.fwd = self.bwd = self.pow = [0]
+            return
+
+        seq = _interleave(string, inter_string)
+        self.fwd = _prefix_hashes(seq, self.base)
+        self.bwd = None
+        if rev:
+            self.bwd = _prefix_hashes(
+                (rev(x) if k % self.stride == 0 else x
+                 for k, x in enumerate(reversed(seq))),
+                self.base)
+
+        self.pow = [1]
+        for _ in seq:
+            self.pow.append(self.pow[-1] * self.base % MOD)
+
+    def _window(self, h, k, L):
+        size = self.stride * (L - 1) + 1
+        k *= self.stride
+        return (h[k + size] - h[k] * self.pow[size]) % MOD
+
+    def forward(self, i, L):
+        return self._window(self.fwd, i, L)
+
+    def reverse(self, i, L):
+        return self._window(self.bwd, self.n - i - L, L)
+
+    def canonical(self, i, L):
+        if self.bwd is None: return self.forward(i, L)
+        return min(self.forward(i, L), self.reverse(i, L))
+
+    def find(self, h, L):
+        if L not in self.windows:
+            index = self.windows[L] = dict()
+            for p in range(self.n - L + 1):
+                index.setdefault(self.canonical(p, L), []).append(p)
+        return self.windows[L].get(h, [])
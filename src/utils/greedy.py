@@ -0,0 +1,28 @@
+import numpy as np
+
+def greedy_blocks(k1, k2, length, n1, n2):
+    # longest-first: take every common block that overlaps no earlier pick
+    free1 = np.ones(n1, dtype=bool)
+    free2 = np.ones(n2, dtype=bool)
+    picked = np.zeros(len(length), dtype=bool)
+    left = min(n1, n2)
+    for i in np.argsort(-np.asarray(length), kind='stable').tolist():
+        a, b, L = int(k1[i]), int(k2[i]), int(length[i])
+        if L > left: continue
+        if free1[a:a + L].all() and free2[b:b + L].all():
+            free1[a:a + L] = False
+            free2[b:b + L] = False
+            picked[i] = True
+            left -= L
+            if not left: break
+    return picked, free1, free2
+
+def greedy_exclusive(E, free):
+    # covers what is left of a string with the longest free exclusive blocks
+    picked = np.zeros(len(E), dtype=bool)
+    for i in np.argsort(-E[:, 1], kind='stable').tolist():
+        k, L = int(E[i, 0]), int(E[i, 1])
+        if free[k:k + L].all():
+            free[k:k + L] = False
+            picked[i] = True
+    return picked
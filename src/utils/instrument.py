@@ -0,0 +1,136 @@
+from contextlib import contextmanager, nullcontext
+import os
+import sys
+from timeit import default_timer
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+_NULL = nullcontext()
+
+def _mb(size):
+    return round(size / (1 << 20), 1)
+
+def _size(size):
+    if size >= 1 << 20: return f'{size / (1 << 20):.1f}M'
+    return f'{size >> 10}K' if size >= 1 << 10 else f'{size}B'
+
+def peak_rss():
+    # high-water mark of the resident memory of the process, in bytes
+    if resource is None: return 0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == 'darwin' else rss << 10
+
+def _snapshot():
+    # leaving out the profiling itself and the imports
+    return tracemalloc.take_snapshot().filter_traces(
+        (tracemalloc.Filter(False, tracemalloc.__file__),
+         tracemalloc.Filter(False, __file__),
+         tracemalloc.Filter(False, '<frozen importlib*')))
+
+def set_memory_cap(cap):
+    # caps the address space of the process at cap bytes, so that any
+    # allocation past it raises MemoryError instead of waking the OOM
+    # killer; returns the limits to give back to restore_memory_cap
+    if cap is None or resource is None: return None
+    old = resource.getrlimit(resource.RLIMIT_AS)
+    if old[1] != resource.RLIM_INFINITY:
+        cap = min(cap, old[1])
+    resource.setrlimit(resource.RLIMIT_AS, (cap, old[1]))
+    return old
+
+def restore_memory_cap(old):
+    if old is not None:
+        resource.setrlimit(resource.RLIMIT_AS, old)
+
+class Profile:
+    # wall time of the phases of one run and counters, reported along with
+    # its stats. Disabled, phase() hands out one shared null context and
+    # count() returns at once, so the calls can stay in the hot paths. The
+    # 'memory' mode also takes, per phase, the peak resident memory of the
+    # process at its end, how far the Python allocations (numpy and scipy
+    # included, the solvers not) peaked over where they were at its start
+    # and the lines that allocated the most in it, through tracemalloc
+    def __init__(self, mode=False):
+        self.enabled = bool(mode)
+        self.memory = mode == 'memory'
+        self.times = dict()
+        self.counts = dict()
+        self.rss = dict()
+        self.peaks = dict()
+        self.top = dict()
+        self._stack = []
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def phase(self, name):
+        return self._timed(name) if self.enabled else _NULL
+
+    @contextmanager
+    def _timed(self, name):
+        if self.memory:
+            self._enter()
+        t = default_timer()
+        try:
+            yield
+        finally:
+            self.times[name] = self.times.get(name, 0) + default_timer() - t
+            if self.memory:
+                self._leave(name)
+
+    def _enter(self):
+        # the traced peak is reset for every phase, so the enclosing ones
+        # take it over first
+        current, peak = tracemalloc.get_traced_memory()
+        for frame in self._stack:
+            frame[0] = max(frame[0], peak)
+        tracemalloc.reset_peak()
+        self._stack.append([current, _snapshot(), current])
+
+    def _leave(self, name):
+        _, peak = tracemalloc.get_traced_memory()
+        frame = self._stack.pop()
+        peak = max(frame[0], peak)
+        for outer in self._stack:
+            outer[0] = max(outer[0], peak)
+        self.peaks[name] = max(self.peaks.get(name, 0), peak - frame[2])
+        self.rss[name] = peak_rss()
+        try:
+            stats = _snapshot().compare_to(frame[1], 'lineno')
+        except MemoryError:
+            # leaving a phase that ran out of memory
+            return
+        stats = sorted((s for s in stats if s.size_diff > 0),
+                       key=lambda s: -s.size_diff)[:3]
+        self.top[name] = [f'{os.path.basename(s.traceback[0].filename)}:'
+                          f'{s.traceback[0].lineno} {_size(s.size_diff)}'
+                          for s in stats]
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counts[name] = self.counts.get(name, 0) + n
+
+    def stats(self):
+        return {**{f'time_{name}': t for name, t in self.times.items()},
+                **self.counts,
+                **{f'rss_{name}': _mb(m) for name, m in self.rss.items()},
+                **{f'mem_{name}': _mb(m) for name, m in self.peaks.items()},
+                **{f'top_{name}': t for name, t in self.top.items()}}
+
+class CountingCompare:
+    # a compare function counting its calls. Like VectorCompare it exposes
+    # the plain function as base, so the incremental matchers, the JIT
+    # kernels and the block cache still recognise it; those never call it
+    def __init__(self, compare):
+        self.compare = compare
+        self.base = getattr(compare, 'base', compare)
+        self.calls = 0
+        if hasattr(compare, 'find_sub'):
+            self.find_sub = compare.find_sub
+
+    def __call__(self, l1, l2, i1, i2, reverse):
+        self.calls += 1
+        return self.compare(l1, l2, i1, i2, reverse)
@@ -1,4 +1,7 @@
-from itertools import product
+import numpy as np
+
+from . import accel
+from .fingerprint import Fingerprint
 
 def compare(l1, l2, i1, i2, reverse):
     # print(l1, l2, i1, i2)
@@ -24,7 +27,15 @@ def signaled_flex_compare(l1, l2, i1, i2, _):
     return dir_comp or rev_comp
 
 
+_ACCEL_MODES = {compare: 0, signaled_compare: -1, signaled_flex_compare: -1}
+
 def find_sub(block, string, inter_block, inter_string, compare, reverse):
+    if hasattr(compare, 'find_sub'):
+        return compare.find_sub(block, string, inter_block, inter_string,
+                                reverse)
+    if accel.enabled() and compare in _ACCEL_MODES:
+        return accel.inter_find_sub(block, string, inter_block, inter_string,
+                                    _ACCEL_MODES[compare] or int(reverse))
     l_pos = []
     start = 0
     while start <= len(string) - len(block):
@@ -79,45 +90,170 @@ def find_substrings(l1, l2, i1, i2, compare, reverse = False, signaled = False):
 
     return (B1, B2)
 
-def find_substrings2(l1, l2, i1, i2, compare, reverse = False, signaled = False):
-    B = set()
+def find_substrings2(l1, l2, i1, i2, compare, reverse = False, signaled = False,
+                     starts = None):
+    try:
+        rev, flex = _matcher(compare, reverse)
+    except ValueError:
+        rev = (lambda x: -x) if signaled else (lambda x: x) if reverse else None
+        flex = True
+
+    fp1 = Fingerprint(l1, i1, rev)
+    fp2 = None if flex else Fingerprint(l2, i2, rev, fp1.base)
+    keys = dict()
     B1 = dict()
     B2 = dict()
 
-    for i in range(len(l1)):
+    for i in range(len(l1)) if starts is None else starts:
         for j in range(i, len(l1)):
             # print(f'{i}:{j}')
+            # the fingerprint only narrows the search: a hit is checked
+            # against the substring itself, so a collision costs time only
+            h = fp1.canonical(i, j - i + 1)
+            block = (tuple(l1[i:j + 1]), tuple(i1[i:j]))
+            key = next((k for k in keys.get(h, ()) if _same(k, block, rev)),
+                       None)
+            if key is not None:
+                B1[key].append(i)
+                continue
+
+            if fp2 is None:
+                pos = find_sub(l1[i:j + 1], l2, i1[i:j], i2, compare, reverse)
+            else:
+                pos = [p for p in fp2.find(h, j - i + 1)
+                       if _same(block, _window(l2, i2, p, j - i + 1), rev)]
+            if pos:
+                keys.setdefault(h, []).append(block)
+                B1[block] = [i]
+                B2[block] = pos
+            else:
+                break
+
+    return (B1, B2)
+
+def _window(string, inter_string, p, L):
+    return (tuple(string[p:p + L]), tuple(inter_string[p:p + L - 1]))
+
+def _same(key, block, rev):
+    # whether two (substring, intergenic) keys are the same block, in either
+    # orientation when rev is given
+    if key == block: return True
+    if rev is None: return False
+    t, inter = block
+    return key == (tuple(rev(x) for x in reversed(t)), tuple(reversed(inter)))
+
+def _matcher(comp, reverse):
+    comp = getattr(comp, 'base', comp)
+    if comp is signaled_flex_compare: return (lambda x: -x, True)
+    if comp is signaled_compare: return (lambda x: -x, False)
+    if comp is compare and reverse: return (lambda x: x, False)
+    if comp is compare: return (None, False)
+    raise ValueError(f'no incremental matcher for {comp}')
+
+def _char_index(string, rev):
+    index = dict()
+    for p, c in enumerate(string):
+        index.setdefault(c, []).append((p, False))
+        if rev: index.setdefault(rev(c), []).append((p, True))
+    return index
+
+def _extend(occ, c, x1, l2, l2r, i2, size, flex):
+    ext = []
+    for p, r in occ:
+        q = p - 1 if r else p + size
+        if not 0 <= q < len(l2) or (l2r if r else l2)[q] != c: continue
+        x2 = i2[q] if r else i2[q - 1]
+        if x2[0] <= x1 <= x2[1] if flex else x1 == x2:
+            ext.append((q if r else p, r))
+    return ext
+
+def merge_orientations(B1, B2, rev):
+    if rev is None: return (B1, B2)
+    M1 = dict()
+    M2 = dict()
+    for (t, inter), ks in B1.items():
+        key = (tuple(rev(x) for x in reversed(t)), tuple(reversed(inter)))
+        if key in M1:
+            M1[key] = sorted(M1[key] + ks)
+        else:
+            M1[(t, inter)] = ks
+            M2[(t, inter)] = B2[(t, inter)]
+    return (M1, M2)
+
+def find_substrings_inc(l1, l2, i1, i2, compare, reverse = False,
+                        signaled = False, starts = None):
+    try:
+        rev, flex = _matcher(compare, reverse)
+    except ValueError:
+        return find_substrings2(l1, l2, i1, i2, compare, reverse, signaled,
+                                starts)
+
+    index = _char_index(l2, rev)
+    l2r = [rev(x) for x in l2] if rev else l2
+    occs = dict()
+    B1 = dict()
+    B2 = dict()
+
+    for i in range(len(l1)) if starts is None else starts:
+        occ = index.get(l1[i], [])
+        for j in range(i, len(l1)):
             t = tuple(l1[i:j + 1])
             inter = tuple(i1[i:j])
 
             if (t, inter) in B1:
                 B1[(t, inter)].append(i)
+                occ = occs[(t, inter)]
                 continue
-            
-            t_ = (-x for x in reversed(t))
-            inter_ = tuple(reversed(t))
-            if signaled and (t_, inter_) in B1:
-                B1[(t_, inter_)].append(i)
-                continue
+            if (t, inter) in occs: break
 
-            pos = find_sub(list(t), l2, list(inter), i2, compare, reverse)
-            if pos:
-                if (t, inter) not in B1:
-                    B1[(t, inter)] = []
-                    B2[(t, inter)] = []
-                B1[(t, inter)].append(i)
-                B2[(t, inter)].extend(pos)
-            else:
-                break
+            if j > i:
+                occ = _extend(occ, l1[j], i1[j - 1], l2, l2r, i2, j - i, flex)
+            occs[(t, inter)] = occ
+            if not occ: break
+            B1[(t, inter)] = [i]
+            B2[(t, inter)] = sorted(set(p for p, _ in occ))
 
-    return (B1, B2)
+    return merge_orientations(B1, B2, rev)
+
+def flex_bounds(inter_string, interval):
+    return [(round((1 - interval) * x), round((1 + interval) * x))
+            for x in inter_string]
+
+def _occurrence_level(t, inter, p, l2, bounds):
+    L = len(t)
+    w = l2[p:p + L]
+    level = len(bounds)
+    for r, ok in ((False, list(t) == w),
+                  (True, list(t) == [-x for x in reversed(w)])):
+        if not ok: continue
+        lv = 0
+        for m, x1 in enumerate(inter):
+            q = p + L - 2 - m if r else p + m
+            while lv < len(bounds) and not (
+                    bounds[lv][q][0] <= x1 <= bounds[lv][q][1]):
+                lv += 1
+        level = min(level, lv)
+    return level
+
+def find_substrings_sweep(l1, l2, i1, i2, intervals, reverse = False,
+                          signaled = True):
+    bounds = [flex_bounds(i2, x) for x in sorted(intervals)]
+    B1, B2 = find_substrings_inc(l1, l2, i1, bounds[-1], signaled_flex_compare,
+                                 reverse, signaled)
+    levels = {(t, inter): [_occurrence_level(t, inter, p, l2, bounds)
+                           for p in B2[(t, inter)]]
+              for t, inter in B1}
+    return (B1, B2, levels)
 
-def substrings_to_blocks(B1, B2):
-    B = []
-    for t in B1:
-        B.extend(product((t,), B1[t], B2[t]))
-    # print(B)
-    return B
+def filter_tolerance(B1, B2, levels, level):
+    F1 = dict()
+    F2 = dict()
+    for t, ks in B1.items():
+        pos = [p for p, lv in zip(B2[t], levels[t]) if lv <= level]
+        if pos:
+            F1[t] = list(ks)
+            F2[t] = pos
+    return (F1, F2)
 
 def get_abundant_chars(l1,l2):
     counts = [{},{}]
@@ -145,27 +281,24 @@ def get_abundant_chars(l1,l2):
 def _find_abundant_run_from(string, start, abundant):
     for i in range(start, len(string)):
         if string[i] in abundant: break
-    else: return (-1, None)
+    else: return (-1, 0)
 
     for j in range(i+1, len(string)):
         if string[j] not in abundant: break
-    else: j = len(string) + 1
+    else: j = len(string)
 
-    return (i, string[i:j])
+    return (i, j - i)
 
-def _get_all_exclusive_substrs(substring, idx):
-    blocks = []
-    for i in range(len(substring)):
-        for j in range(i + 1, len(substring) + 1):
-            blocks.append((substring[i:j], i + idx))
-    return blocks
+def _get_all_exclusive_substrs(size, idx):
+    a, b = np.triu_indices(size + 1, k=1)
+    return np.stack((a + idx, b - a), axis=1)
 
 def get_exclusive_blocks(string, abundant):
     i = 0
-    blocks = []
+    blocks = [np.empty((0, 2), dtype=np.int64)]
     while i < len(string):
-        idx, sub = _find_abundant_run_from(string, i, abundant)
-        if sub == None: break
-        blocks.extend(_get_all_exclusive_substrs(sub, idx))
-        i = idx + len(sub)
-    return blocks
\ No newline at end of file
+        idx, size = _find_abundant_run_from(string, i, abundant)
+        if not size: break
+        blocks.append(_get_all_exclusive_substrs(size, idx))
+        i = idx + size
+    return np.concatenate(blocks)
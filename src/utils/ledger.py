@@ -0,0 +1,75 @@
+import json
+import sqlite3
+import time
+
+def params(args, kwargs):
+    # the settings of a run besides its instance, which the log name already
+    # tells apart, its budget, which a retry raises, and the instrumentation,
+    # which does not change the result; other values count
+    # by name (the compare function) or not at all (blocks, caches)
+    def plain(value):
+        if isinstance(value, (bool, int, float, str, type(None))):
+            return value
+        return getattr(value, '__name__', None)
+    return json.dumps({'args': [plain(a) for a in args[2:]],
+                       **{k: plain(v) for k, v in kwargs.items()
+                          if k not in ('threads', 'limit', 'profile')}},
+                      sort_keys=True)
+
+class Ledger:
+    # sqlite record of every run of a sweep, keyed on its log and params(),
+    # with its state: 'running' from the start, then 'done', 'limit' when the
+    # solver ran out of time, 'oom' when it stopped at its memory cap, or
+    # 'crashed' when the process died. A row left 'running' belongs to a
+    # sweep that was killed. Only the path is kept, so the runs can write
+    # their own results from their processes
+    def __init__(self, path):
+        self.path = path
+        self._execute('CREATE TABLE IF NOT EXISTS jobs ('
+                      'log TEXT, params TEXT, state TEXT, started REAL, '
+                      'ended REAL, time_limit REAL, exitcode INTEGER, '
+                      'runtime REAL, last_sol REAL, best_bd REAL, gap REAL, '
+                      'PRIMARY KEY (log, params))')
+
+    def _execute(self, sql, args=()):
+        db = sqlite3.connect(self.path, timeout=60)
+        try:
+            with db:
+                return db.execute(sql, args).fetchall()
+        finally:
+            db.close()
+
+    def get(self, log, params):
+        rows = self._execute('SELECT state, time_limit FROM jobs '
+                             'WHERE log = ? AND params = ?', (log, params))
+        return rows[0] if rows else (None, None)
+
+    def start(self, log, params):
+        self._execute('INSERT OR REPLACE INTO jobs (log, params, state, '
+                      'started) VALUES (?, ?, ?, ?)',
+                      (log, params, 'running', time.time()))
+
+    def finish(self, log, params, ilp):
+        model = getattr(ilp, 'model', None)
+        watcher = getattr(ilp, 'watcher', None)
+        runtime = model.runtime if model is not None else 0
+        state = 'limit' if runtime >= 0.99 * ilp.limit else 'done'
+        if ilp.oom is not None:
+            state = 'oom'
+        self._execute('UPDATE jobs SET state = ?, ended = ?, time_limit = ?, '
+                      'exitcode = 0, runtime = ?, last_sol = ?, best_bd = ?, '
+                      'gap = ? WHERE log = ? AND params = ?',
+                      (state, time.time(), ilp.limit, runtime,
+                       watcher.last_sol if watcher else None,
+                       model.bound if model is not None else None,
+                       model.gap if model is not None else None, log, params))
+
+    def fail(self, log, params, exitcode):
+        self._execute('UPDATE jobs SET state = ?, ended = ?, exitcode = ? '
+                      'WHERE log = ? AND params = ? AND state = ?',
+                      ('crashed', time.time(), exitcode, log, params,
+                       'running'))
+
+    def drop(self, log, params):
+        self._execute('DELETE FROM jobs WHERE log = ? AND params = ?',
+                      (log, params))
@@ -0,0 +1,106 @@
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import os
+
+import numpy as np
+
+from . import blocks, inter
+
+# the strings of the enumeration, handed to every worker once as it starts.
+# The engines index them element by element as Python lists, so each worker
+# holds its own copy
+_strings = None
+
+def _attach(strings):
+    global _strings
+    _strings = strings
+
+def _enumerate_shard(starts, compare, reverse, signaled):
+    l1, l2, i1, i2 = _strings
+    B1, B2 = inter.find_substrings_inc(l1, l2, i1, i2, compare, reverse,
+                                       signaled, starts)
+    return (list(B1.items()), [B2[t] for t in B1])
+
+def _chain_blocks(starts, compare, reverse, signaled):
+    # the substrings blocks.find_substrings would look up from each start,
+    # with their occurrences in l2. A chain goes on while the substring or
+    # its reverse occurs, since the parent may know the latter as a block
+    l1, l2 = _strings
+    rev = (lambda x: -x) if signaled else (lambda x: x) if reverse else None
+    found = dict()
+    def occurrences(t):
+        if t not in found:
+            found[t] = blocks.find_sub(t, l2, compare, reverse)
+        return found[t]
+
+    chains = []
+    for i in starts:
+        chain = []
+        for j in range(i, len(l1)):
+            t = tuple(l1[i:j + 1])
+            pos = occurrences(t)
+            chain.append((t, pos))
+            if not pos and not (rev and
+                                occurrences(tuple(rev(x) for x in reversed(t)))):
+                break
+        chains.append((i, chain))
+    return chains
+
+def _map(shard, strings, workers, shards):
+    # runs shard over contiguous ranges of start positions of l1, in order
+    workers = workers or os.cpu_count()
+    shards = shards or workers
+    bounds = np.linspace(0, len(strings[0]), shards + 1).astype(int)
+    starts = [range(a, b) for a, b in zip(bounds, bounds[1:]) if a < b]
+    with ProcessPoolExecutor(workers, initializer=_attach,
+                             initargs=(strings,)) as pool:
+        return list(pool.map(shard, starts))
+
+def find_substrings_par(l1, l2, i1, i2, compare, reverse = False,
+                        signaled = False, workers = None, shards = None):
+    results = _map(partial(_enumerate_shard, compare=compare, reverse=reverse,
+                           signaled=signaled),
+                   (l1, l2, i1, i2), workers, shards)
+
+    B1 = dict()
+    B2 = dict()
+    for items, pos in results:
+        for (t, ks), ps in zip(items, pos):
+            if t in B1:
+                B1[t].extend(ks)
+            else:
+                B1[t] = ks
+                B2[t] = ps
+
+    try:
+        rev, _ = inter._matcher(compare, reverse)
+    except ValueError:
+        rev = (lambda x: -x) if signaled else (lambda x: x) if reverse else None
+    return inter.merge_orientations(B1, B2, rev)
+
+def find_blocks_par(l1, l2, compare, reverse = False, signaled = False,
+                    workers = None, shards = None):
+    # blocks.find_substrings with the find_sub calls spread over the
+    # workers; the loop itself is replayed here, in order, as a block found
+    # in one orientation decides where the other is recorded
+    results = _map(partial(_chain_blocks, compare=compare, reverse=reverse,
+                           signaled=signaled),
+                   (l1, l2), workers, shards)
+    rev = (lambda x: -x) if signaled else (lambda x: x) if reverse else None
+
+    B1 = dict()
+    B2 = dict()
+    for chains in results:
+        for i, chain in chains:
+            for t, pos in chain:
+                key = t
+                if t not in B1 and rev:
+                    key = tuple(rev(x) for x in reversed(t))
+                if key in B1:
+                    B1[key].append(i)
+                elif pos:
+                    B1[t] = [i]
+                    B2[t] = pos
+                else:
+                    break
+    return (B1, B2)
@@ -0,0 +1,61 @@
+from importlib.util import find_spec
+import json
+import os
+
+import numpy as np
+
+from .cache import _plain
+
+def append(path, record):
+    # one JSON line per run, written at once so that runs in parallel
+    # processes can share the file
+    line = (json.dumps(record, default=_plain) + '\n').encode()
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+
+def _missing(value):
+    return value is None or isinstance(value, float) and value != value
+
+def _parquet(path):
+    return f'{os.path.splitext(path)[0]}.parquet'
+
+def load(path, drivers=None):
+    # every record: those compacted into the Parquet file next to the JSON
+    # lines, then the ones appended since. The drivers share the file, so
+    # their readers keep the records of the drivers given
+    import pandas as pd
+
+    frames = []
+    if os.path.exists(_parquet(path)):
+        frames.append(pd.read_parquet(_parquet(path)))
+    if os.path.exists(path):
+        with open(path) as f:
+            frames.append(pd.DataFrame.from_records(
+                [json.loads(line) for line in f if line.strip()]))
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    if drivers is not None:
+        df = (df[df['driver'].isin(drivers)].reset_index(drop=True)
+              if 'driver' in df else pd.DataFrame())
+    return df
+
+def compact(path):
+    # folds the JSON lines into the Parquet file and empties them; meant for
+    # the end of a sweep, with no run appending. Without pyarrow the records
+    # stay as JSON lines, which load() reads all the same
+    if find_spec('pyarrow') is None or not os.path.exists(path): return
+    df = load(path)
+    # a stat whose type depends on the flags (cliques is False, 'root' or
+    # 'lazy') is stored as text; lists read back from Parquet are arrays
+    for col in df.columns[df.dtypes == object]:
+        values = df[col].map(lambda v: v.tolist() if isinstance(v, np.ndarray)
+                             else v)
+        if len({type(v) for v in values if not _missing(v)}) > 1:
+            values = values.map(lambda v: v if _missing(v) else str(v))
+        df[col] = values
+    tmp = f'{_parquet(path)}.{os.getpid()}.tmp'
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, _parquet(path))
+    open(path, 'w').close()
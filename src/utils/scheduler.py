@@ -0,0 +1,155 @@
+from collections import Counter
+from multiprocessing import get_context
+import os
+import sys
+import time
+from timeit import default_timer
+
+from . import results as _results
+from .ledger import params
+
+def estimate(l1, l2):
+    # matching position pairs of the two strings, which bound the common
+    # block pairs and so grow with both the model and the solve time
+    c1, c2 = Counter(map(abs, l1)), Counter(map(abs, l2))
+    return sum(n * c2[c] for c, n in c1.items())
+
+def _rss(pid):
+    # resident set size of a process in bytes, 0 where /proc is missing
+    try:
+        with open(f'/proc/{pid}/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return 0
+
+def _run(log, impl, args, kwargs, key, meta, setup, ledger, results):
+    with open(log, 'w') as sys.stdout:
+        t = default_timer()
+        ilp = impl(*args, **kwargs)
+        ilp.run()
+        total_time = default_timer() - t + setup
+        print(f'total_time: {total_time}')
+    if results is not None:
+        _results.append(results, {**meta, 'log': log, 'params': key,
+                                  **ilp.record(), 'total_time': total_time})
+    if ledger is not None:
+        ledger.finish(log, key, ilp)
+
+class Scheduler:
+    # runs ILPs, each one in a fresh process with its stdout sent to a log
+    # file, as many at once as the cores allow given what each one takes:
+    # its solver threads, or its enumeration workers if more, and with
+    # decompose as many solves at once as workers. Jobs start longest first by estimate() so the long ones do not
+    # trail at the end. With a memory cap a job only starts while the
+    # resident memory of the running ones, plus what it is expected to need
+    # from the peaks seen so far, fits in it; if the running jobs outgrow
+    # the cap the newest one is stopped and queued again. A single job is
+    # never stopped, whatever its size. With a ledger, runs it has as done
+    # or stopped at their memory cap are skipped and those that ran out of
+    # time too, unless retry gives the factor to raise their limit by;
+    # anything else runs again. With a results file every run appends its
+    # record() there, along with the meta it was added with and its params(). The setup of a
+    # job is the time the driver already spent on it, e.g. its share of an
+    # enumeration done once for several jobs, and counts in its total_time
+    def __init__(self, cores=None, threads=1, memory=None, ledger=None,
+                 retry=None, results=None, poll=0.5):
+        self.threads = threads
+        self.cores = max(1, cores or os.cpu_count() or 1)
+        self.memory = memory
+        self.ledger = ledger
+        self.retry = retry
+        self.results = results
+        self.poll = poll
+        self.jobs = []
+        self.ratio = 0
+
+    def _state(self, log, key):
+        state, limit = self.ledger.get(log, key)
+        skip = state in ('done', 'oom') or state == 'limit' and not self.retry
+        return skip, limit if state == 'limit' else None
+
+    def skips(self, log, impl, *args, **kwargs):
+        # whether add() would leave the job out, so that the driver can spare
+        # the work of preparing it
+        if self.ledger is None: return False
+        return self._state(log, params(args, kwargs))[0]
+
+    def add(self, log, impl, *args, meta=None, setup=0, **kwargs):
+        kwargs['threads'] = self.threads
+        key = params(args, kwargs)
+        if self.ledger is not None:
+            skip, limit = self._state(log, key)
+            if skip: return
+            if limit is not None:
+                kwargs['limit'] = limit * self.retry
+        size = max(1, estimate(args[0], args[1]))
+        self.jobs.append((size, log, impl, args, kwargs, key, meta or {},
+                          setup))
+
+    def _cores(self, kwargs):
+        # cores a job keeps busy at its peak; one that needs more than all
+        # of them still runs, alone
+        workers = kwargs.get('workers', 1)
+        threads = kwargs['threads']
+        if kwargs.get('decompose') and workers > 1:
+            return min(self.cores, workers * threads)
+        return min(self.cores, max(threads, workers))
+
+    def _fits(self, running, size):
+        if self.memory is None or not running: return True
+        used = sum(_rss(p.pid) for p, _, _, _ in running)
+        return used + self.ratio * size <= self.memory
+
+    def _stop_newest(self, running):
+        used = sum(_rss(p.pid) for p, _, _, _ in running)
+        if self.memory is None or used <= self.memory or len(running) < 2:
+            return None
+        p, job, _, peak = running.pop()
+        p.terminate()
+        p.join()
+        if self.ledger is not None:
+            self.ledger.drop(job[1], job[5])
+        self.ratio = max(self.ratio, peak / job[0])
+        print(f'{job[1]}: stopped over the memory cap, queued again')
+        return job
+
+    def run(self):
+        ctx = get_context('spawn')
+        pending = sorted(self.jobs, key=lambda job: -job[0])
+        self.jobs = []
+        running = []
+        failed = []
+        while pending or running:
+            while (pending and
+                   sum(self._cores(job[4]) for _, job, _, _ in running) +
+                   self._cores(pending[0][4]) <= self.cores and
+                   self._fits(running, pending[0][0])):
+                job = pending.pop(0)
+                if self.ledger is not None:
+                    self.ledger.start(job[1], job[5])
+                p = ctx.Process(target=_run, args=job[1:] + (self.ledger, self.results))
+                p.start()
+                running.append((p, job, default_timer(), 0))
+
+            time.sleep(self.poll)
+            for i, (p, job, t, peak) in enumerate(running):
+                running[i] = (p, job, t, max(peak, _rss(p.pid)))
+            if (job := self._stop_newest(running)) is not None:
+                pending.insert(0, job)
+
+            done, alive = [], []
+            for r in running:
+                (alive if r[0].is_alive() else done).append(r)
+            running = alive
+            for p, job, t, peak in done:
+                p.join()
+                self.ratio = max(self.ratio, peak / job[0])
+                if p.exitcode:
+                    failed.append(job[1])
+                    if self.ledger is not None:
+                        self.ledger.fail(job[1], job[5], p.exitcode)
+                print(f'{job[1]}: exit {p.exitcode} after '
+                      f'{default_timer()-t:.1f}s')
+        if self.results is not None:
+            _results.compact(self.results)
+        return failed
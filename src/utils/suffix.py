@@ -0,0 +1,132 @@
+from . import inter
+
+def suffix_array(text):
+    n = len(text)
+    sa = sorted(range(n), key=text.__getitem__)
+    rank = [0] * n
+    for a, b in zip(sa, sa[1:]):
+        rank[b] = rank[a] + (text[a] != text[b])
+
+    k = 1
+    while k < n and rank[sa[-1]] < n - 1:
+        key = lambda i: (rank[i], rank[i + k] if i + k < n else -1)
+        sa.sort(key=key)
+        new = [0] * n
+        for a, b in zip(sa, sa[1:]):
+            new[b] = new[a] + (key(a) != key(b))
+        rank = new
+        k *= 2
+    return sa
+
+def lcp_array(text, sa):
+    n = len(text)
+    rank = [0] * n
+    for r, i in enumerate(sa):
+        rank[i] = r
+
+    lcp = [0] * n
+    h = 0
+    for i in range(n):
+        if rank[i] == 0:
+            h = 0
+            continue
+        j = sa[rank[i] - 1]
+        while i + h < n and j + h < n and text[i + h] == text[j + h]:
+            h += 1
+        lcp[rank[i]] = h
+        if h: h -= 1
+    return lcp
+
+def _interleave(string, inter_string):
+    text = []
+    for c, g in zip(string, inter_string):
+        text.append((0, c))
+        text.append((1, g))
+    text.append((0, string[-1]))
+    return text
+
+def _build_text(l1, l2, i1, i2, rev):
+    parts = [_interleave(l1, i1), _interleave(l2, i2)]
+    if rev:
+        parts.append(_interleave([rev(x) for x in reversed(l2)],
+                                 list(reversed(i2))))
+
+    tokens = sorted(set().union(*parts))
+    nchars = sum(1 for tag, _ in tokens if tag == 0)
+    tokens = {t: r for r, t in enumerate(tokens)}
+    text = []
+    offsets = []
+    for sep, part in enumerate(parts):
+        offsets.append(len(text))
+        text.extend(tokens[t] for t in part)
+        text.append(-sep - 1)
+    return text, offsets, nchars
+
+def _lcp_intervals(lcp):
+    stack = [(0, 0)]
+    for i in range(1, len(lcp) + 1):
+        h = lcp[i] if i < len(lcp) else 0
+        lb = i - 1
+        while h < stack[-1][0]:
+            depth, lb = stack.pop()
+            yield depth, max(h, stack[-1][0]), lb, i - 1
+        if h > stack[-1][0]:
+            stack.append((h, lb))
+
+def calls_compare(compare, reverse = False):
+    # whether find_substrings_sa calls compare at all: the suffix array and
+    # the incremental matchers compare the strings themselves, and only a
+    # function without a matcher is called on every candidate, unless it
+    # scans the string with its own find_sub
+    try:
+        inter._matcher(compare, reverse)
+    except ValueError:
+        return not hasattr(compare, 'find_sub')
+    return False
+
+def find_substrings_sa(l1, l2, i1, i2, compare, reverse = False,
+                       signaled = False):
+    try:
+        rev, flex = inter._matcher(compare, reverse)
+    except ValueError:
+        flex = True
+    if flex:
+        return inter.find_substrings_inc(l1, l2, i1, i2, compare, reverse,
+                                         signaled)
+    if not l1 or not l2: return (dict(), dict())
+
+    text, offsets, nchars = _build_text(l1, l2, i1, i2, rev)
+    o2, o3 = offsets[1], offsets[-1]
+    sa = suffix_array(text)
+    lcp = lcp_array(text, sa)
+    n2 = len(l2)
+
+    found = []
+    for depth, parent, lb, rb in _lcp_intervals(lcp):
+        if text[sa[lb]] >= nchars: continue
+        lo, hi = (parent + 1) // 2 + 1, (depth + 1) // 2
+        if lo > hi: continue
+
+        k1, k2, k3 = [], [], []
+        for s in sa[lb:rb + 1]:
+            if s < o2:
+                k1.append(s // 2)
+            elif s < o3 or not rev:
+                k2.append((s - o2) // 2)
+            else:
+                k3.append((s - o3) // 2)
+        if not k1 or not (k2 or k3): continue
+
+        k1.sort()
+        for L in range(lo, hi + 1):
+            pos = set(k2)
+            pos.update(n2 - q - L for q in k3)
+            found.append((k1[0], L, k1, sorted(pos)))
+
+    B1 = dict()
+    B2 = dict()
+    for i, L, ks, pos in sorted(found, key=lambda x: x[:2]):
+        key = (tuple(l1[i:i + L]), tuple(i1[i:i + L - 1]))
+        B1[key] = list(ks)
+        B2[key] = pos
+    return inter.merge_orientations(B1, B2, rev)
@@ -0,0 +1,76 @@
+import numpy as np
+import scipy.sparse as sp
+
+def flatten(lists):
+    sizes = np.fromiter((len(l) for l in lists), dtype=np.int64,
+                        count=len(lists))
+    flat = np.fromiter((k for l in lists for k in l), dtype=np.int64,
+                       count=int(sizes.sum()))
+    return flat, sizes, np.concatenate(([0], np.cumsum(sizes)[:-1]))
+
+def _forward(string, keys, pos, sizes):
+    s = np.asarray(string, dtype=np.int64)
+    fwd = np.empty(len(pos), dtype=bool)
+    start = 0
+    for (t, _), size in zip(keys, sizes):
+        idx = pos[start:start + size, None] + np.arange(len(t))
+        fwd[start:start + size] = (s[idx] == t).all(axis=1)
+        start += size
+    return fwd
+
+def coverage(starts, lengths, n):
+    # column i covers rows starts[i] .. starts[i] + lengths[i] - 1; built
+    # column-wise in O(nnz) and converted, so row j lists every block over j
+    starts = np.asarray(starts, dtype=np.int64)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    indptr = np.concatenate(([0], np.cumsum(lengths)))
+    local = np.arange(indptr[-1]) - np.repeat(indptr[:-1], lengths)
+    rows = np.repeat(starts, lengths) + local
+    return sp.csc_matrix((np.ones(len(rows)), rows, indptr),
+                         shape=(n, len(starts))).tocsr()
+
+class BlockTable:
+    def __init__(self, keys, sub, k1, k2, length, orient, inter):
+        self.keys = keys
+        self.sub = sub
+        self.k1 = k1
+        self.k2 = k2
+        self.length = length
+        self.orient = orient
+        self.inter = inter
+
+    @classmethod
+    def from_substrings(cls, l1, l2, B1, B2):
+        keys = list(B1)
+        p1, n1, off1 = flatten([B1[t] for t in keys])
+        p2, n2, off2 = flatten([B2[t] for t in keys])
+        f1 = _forward(l1, keys, p1, n1)
+        f2 = _forward(l2, keys, p2, n2)
+
+        counts = n1 * n2
+        sub = np.repeat(np.arange(len(keys), dtype=np.int32), counts)
+        local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts,
+                                                    counts)
+        i1 = off1[sub] + local // n2[sub]
+        i2 = off2[sub] + local % n2[sub]
+
+        sigs = dict()
+        inter = np.fromiter((sigs.setdefault(g, len(sigs)) for _, g in keys),
+                            dtype=np.int32, count=len(keys))
+        length = np.fromiter((len(t) for t, _ in keys), dtype=np.int32,
+                             count=len(keys))
+        return cls(keys, sub, p1[i1].astype(np.int32), p2[i2].astype(np.int32),
+                   length[sub], (f1[i1] != f2[i2]).astype(np.int8), inter[sub])
+
+    def select(self, mask):
+        return BlockTable(self.keys, self.sub[mask], self.k1[mask],
+                          self.k2[mask], self.length[mask], self.orient[mask],
+                          self.inter[mask])
+
+    def __len__(self):
+        return len(self.sub)
+
+    def __iter__(self):
+        for s, k1, k2 in zip(self.sub.tolist(), self.k1.tolist(),
+                             self.k2.tolist()):
+            yield (self.keys[s], k1, k2)
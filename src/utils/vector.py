@@ -0,0 +1,59 @@
+import numpy as np
+
+from . import inter
+
+class VectorCompare:
+    def __init__(self, base, signed):
+        self.base = base
+        self.signed = signed
+        self._string = self._inter = None
+
+    def __getstate__(self):
+        return {'base': self.base, 'signed': self.signed}
+
+    def __setstate__(self, state):
+        self.__init__(state['base'], state['signed'])
+
+    def __call__(self, l1, l2, i1, i2, reverse):
+        return self.base(l1, l2, i1, i2, reverse)
+
+    def _load(self, string, inter_string):
+        # keyed on the contents, so that a list changed in place is
+        # converted again
+        string, inter_string = tuple(string), tuple(inter_string)
+        if self._string == string and self._inter == inter_string: return
+        self._string, self._inter = string, inter_string
+        self.s = np.asarray(string, dtype=np.int64)
+        self.neg = -self.s
+        g = np.asarray(inter_string, dtype=np.int64)
+        if g.ndim == 1: g = g[:, None]
+        self.lo, self.hi = g[:, 0], g[:, -1]
+
+    def _match(self, block, inter_block, rev, s):
+        L = len(block)
+        m = len(s) - L + 1
+        mask = np.ones(m, dtype=bool)
+        for k in range(L):
+            c = L - 1 - k if rev else k
+            mask &= s[c:c + m] == block[k]
+            if k < L - 1:
+                g = L - 2 - k if rev else k
+                mask &= self.lo[g:g + m] <= inter_block[k]
+                mask &= self.hi[g:g + m] >= inter_block[k]
+            if not mask.any(): break
+        return mask
+
+    def find_sub(self, block, string, inter_block, inter_string, reverse):
+        if len(block) > len(string): return []
+        self._load(string, inter_string)
+
+        mask = self._match(block, inter_block, False, self.s)
+        if self.signed:
+            mask |= self._match(block, inter_block, True, self.neg)
+        elif reverse:
+            mask |= self._match(block, inter_block, True, self.s)
+        return np.flatnonzero(mask).tolist()
+
+compare = VectorCompare(inter.compare, False)
+signaled_compare = VectorCompare(inter.signaled_compare, True)
+signaled_flex_compare = VectorCompare(inter.signaled_flex_compare, True)
@@ -0,0 +1,139 @@
+import random
+
+import numpy as np
+import pytest
+
+from src.utils import accel, blocks, inter, vector
+
+# Without numba the kernels are the plain Python functions, so these still
+# check their logic; with it they check the compiled ones.
+
+SEEDS = range(20)
+
+def _string(rng, n, sigma, signed):
+    chars = range(1, sigma + 1)
+    return [rng.choice(chars) * (rng.choice((1, -1)) if signed else 1)
+            for _ in range(n)]
+
+def _pair(seed, signed):
+    # a shuffled, partly reversed copy, so that blocks occur in both
+    # orientations
+    rng = random.Random(seed)
+    l1 = _string(rng, rng.randint(5, 30), rng.randint(1, 4), signed)
+    l2 = l1[:]
+    rng.shuffle(l2)
+    a, b = sorted(rng.sample(range(len(l2) + 1), 2))
+    sign = -1 if signed else 1
+    l2[a:b] = [sign * x for x in reversed(l2[a:b])]
+    return rng, l1, l2
+
+def _gaps(rng, n):
+    return [rng.randint(0, 3) for _ in range(n - 1)]
+
+@pytest.fixture
+def enabled(monkeypatch):
+    def set(flag):
+        monkeypatch.setattr(accel, '_enabled', flag)
+        accel._loaded[:] = [None, None, None]
+    return set
+
+@pytest.mark.parametrize('seed', SEEDS)
+@pytest.mark.parametrize('reverse', (False, True))
+def test_compare(seed, reverse):
+    rng, l1, l2 = _pair(seed, False)
+    for L in range(1, len(l1) + 1):
+        for i in range(len(l1) - L + 1):
+            for j in range(len(l2) - L + 1):
+                a, b = l1[i:i + L], l2[j:j + L]
+                assert accel.compare(np.array(a), np.array(b), reverse) == \
+                       blocks.compare(a, b, reverse)
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_signaled_compare(seed):
+    rng, l1, l2 = _pair(seed, True)
+    for L in range(1, len(l1) + 1):
+        for i in range(len(l1) - L + 1):
+            for j in range(len(l2) - L + 1):
+                a, b = l1[i:i + L], l2[j:j + L]
+                assert accel.signaled_compare(np.array(a), np.array(b),
+                                              True) == \
+                       blocks.signaled_compare(a, b, True)
+
+@pytest.mark.parametrize('seed', SEEDS)
+@pytest.mark.parametrize('compare, reverse, signed', [
+    (blocks.compare, False, False),
+    (blocks.compare, True, False),
+    (blocks.signaled_compare, True, True)])
+def test_find_sub(seed, compare, reverse, signed, enabled):
+    rng, l1, l2 = _pair(seed, signed)
+    for L in range(1, len(l1) + 1):
+        for i in range(len(l1) - L + 1):
+            block = tuple(l1[i:i + L])
+            enabled(False)
+            expected = blocks.find_sub(block, l2, compare, reverse)
+            enabled(True)
+            assert blocks.find_sub(block, l2, compare, reverse) == expected
+
+@pytest.mark.parametrize('seed', SEEDS)
+@pytest.mark.parametrize('compare, reverse, signed', [
+    (inter.compare, False, False),
+    (inter.compare, True, False),
+    (inter.signaled_compare, False, True),
+    (inter.signaled_flex_compare, False, True)])
+def test_find_sub_inter(seed, compare, reverse, signed, enabled):
+    rng, l1, l2 = _pair(seed, signed)
+    i1, i2 = _gaps(rng, len(l1)), _gaps(rng, len(l2))
+    if compare is inter.signaled_flex_compare:
+        i2 = inter.flex_bounds(i2, 0.5)
+    for L in range(1, len(l1) + 1):
+        for i in range(len(l1) - L + 1):
+            block, inter_block = l1[i:i + L], i1[i:i + L - 1]
+            enabled(False)
+            expected = inter.find_sub(block, l2, inter_block, i2, compare,
+                                      reverse)
+            enabled(True)
+            assert inter.find_sub(block, l2, inter_block, i2, compare,
+                                  reverse) == expected
+
+@pytest.mark.parametrize('seed', SEEDS)
+@pytest.mark.parametrize('compare, reverse, signaled', [
+    (blocks.compare, False, False),
+    (blocks.compare, True, False),
+    (blocks.signaled_compare, True, True)])
+def test_blocks_find_substrings(seed, compare, reverse, signaled, enabled):
+    _, l1, l2 = _pair(seed, signaled)
+    enabled(False)
+    expected = blocks.find_substrings(l1, l2, compare, reverse, signaled)
+    enabled(True)
+    assert blocks.find_substrings(l1, l2, compare, reverse, signaled) == \
+           expected
+
+@pytest.mark.parametrize('seed', SEEDS)
+@pytest.mark.parametrize('find', (inter.find_substrings,
+                                  inter.find_substrings2))
+@pytest.mark.parametrize('compare, reverse, signaled', [
+    (inter.compare, False, False),
+    (inter.compare, True, False),
+    (inter.signaled_compare, False, True),
+    (inter.signaled_flex_compare, False, True)])
+def test_inter_find_substrings(seed, find, compare, reverse, signaled,
+                               enabled):
+    rng, l1, l2 = _pair(seed, signaled)
+    i1, i2 = _gaps(rng, len(l1)), _gaps(rng, len(l2))
+    if compare is inter.signaled_flex_compare:
+        i2 = inter.flex_bounds(i2, 0.5)
+    enabled(False)
+    expected = find(l1, l2, i1, i2, compare, reverse, signaled)
+    enabled(True)
+    assert find(l1, l2, i1, i2, compare, reverse, signaled) == expected
+
+def test_strings_changed_in_place(enabled):
+    enabled(True)
+    l2, i2 = [1, 2, 1], [0, 0]
+    assert blocks.find_sub((1, 2), l2, blocks.compare, False) == [0]
+    assert inter.find_sub([1, 2], l2, [0], i2, inter.compare, False) == [0]
+    assert vector.compare.find_sub([1, 2], l2, [0], i2, False) == [0]
+    l2[:] = [1, 1, 2]
+    assert blocks.find_sub((1, 2), l2, blocks.compare, False) == [1]
+    assert inter.find_sub([1, 2], l2, [0], i2, inter.compare, False) == [1]
+    assert vector.compare.find_sub([1, 2], l2, [0], i2, False) == [1]
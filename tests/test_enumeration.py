@@ -0,0 +1,107 @@
+import random
+
+import pytest
+
+from src.utils import blocks, inter
+from src.utils.fingerprint import Fingerprint
+from src.utils.parallel import find_blocks_par, find_substrings_par
+from src.utils.suffix import find_substrings_sa
+
+# The enumeration engines the ILPs call, against the legacy find_substrings2.
+# Occurrence lists are compared as sets, their order being engine specific.
+
+SEEDS = range(40)
+MODES = [(inter.compare, False, False),
+         (inter.compare, True, False),
+         (inter.signaled_compare, False, True),
+         (inter.signaled_flex_compare, False, True)]
+
+def _instance(seed, signed, flex):
+    # a shuffled, partly reversed copy with gaps, so that blocks occur in
+    # both orientations and the gaps tell some of them apart
+    rng = random.Random(seed)
+    n, sigma = rng.randint(5, 30), rng.randint(1, 4)
+    l1 = [rng.randint(1, sigma) * (rng.choice((1, -1)) if signed else 1)
+          for _ in range(n)]
+    l2 = l1[:]
+    rng.shuffle(l2)
+    a, b = sorted(rng.sample(range(n + 1), 2))
+    l2[a:b] = [(-x if signed else x) for x in reversed(l2[a:b])]
+    i1 = [4 * rng.randint(0, 3) for _ in range(n - 1)]
+    i2 = [4 * rng.randint(0, 3) for _ in range(n - 1)]
+    return l1, l2, i1, inter.flex_bounds(i2, 0.5) if flex else i2
+
+def _blocks(B):
+    B1, B2 = B
+    return {t: (sorted(B1[t]), sorted(B2[t])) for t in B1}
+
+def _legacy(l1, l2, i1, i2, compare, reverse, signaled):
+    return _blocks(inter.find_substrings2(l1, l2, i1, i2, compare, reverse,
+                                          signaled))
+
+@pytest.mark.parametrize('seed', SEEDS)
+@pytest.mark.parametrize('compare, reverse, signaled', MODES)
+@pytest.mark.parametrize('find', (find_substrings_sa,
+                                  inter.find_substrings_inc))
+def test_engine(seed, find, compare, reverse, signaled):
+    args = (*_instance(seed, signaled, compare is inter.signaled_flex_compare),
+            compare, reverse, signaled)
+    assert _blocks(find(*args)) == _legacy(*args)
+
+@pytest.mark.parametrize('seed', range(3))
+@pytest.mark.parametrize('compare, reverse, signaled', MODES)
+def test_parallel(seed, compare, reverse, signaled):
+    args = (*_instance(seed, signaled, compare is inter.signaled_flex_compare),
+            compare, reverse, signaled)
+    assert _blocks(find_substrings_par(*args, workers=2, shards=3)) == \
+           _legacy(*args)
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_sweep(seed):
+    l1, l2, i1, i2 = _instance(seed, True, False)
+    intervals = (0, 0.25, 0.5)
+    sweep = inter.find_substrings_sweep(l1, l2, i1, i2, intervals, False, True)
+    for level, interval in enumerate(intervals):
+        assert _blocks(inter.filter_tolerance(*sweep, level)) == \
+               _legacy(l1, l2, i1, inter.flex_bounds(i2, interval),
+                       inter.signaled_flex_compare, False, True)
+    # the exact variant new_exec.py runs at tolerance 0
+    assert _blocks(inter.filter_tolerance(*sweep, 0)) == \
+           _legacy(l1, l2, i1, i2, inter.signaled_compare, False, True)
+
+@pytest.mark.parametrize('seed', range(10))
+@pytest.mark.parametrize('compare, reverse, signaled', MODES)
+def test_fingerprint_collisions(seed, compare, reverse, signaled,
+                                monkeypatch):
+    # with every window hashing alike, find_substrings2 has to tell the
+    # blocks apart by their contents
+    args = (*_instance(seed, signaled, compare is inter.signaled_flex_compare),
+            compare, reverse, signaled)
+    expected = _blocks(inter.find_substrings_inc(*args))
+    monkeypatch.setattr(Fingerprint, 'canonical', lambda self, i, L: L)
+    assert _blocks(inter.find_substrings2(*args)) == expected
+
+@pytest.mark.parametrize('seed', range(10))
+@pytest.mark.parametrize('compare, reverse, signaled', [
+    (blocks.compare, False, False),
+    (blocks.compare, True, False),
+    (blocks.signaled_compare, True, True)])
+def test_fingerprint_collisions_blocks(seed, compare, reverse, signaled,
+                                       monkeypatch):
+    l1, l2, _, _ = _instance(seed, signaled, False)
+    expected = _blocks(blocks.find_substrings(l1, l2, compare, reverse,
+                                              signaled))
+    monkeypatch.setattr(Fingerprint, 'canonical', lambda self, i, L: L)
+    assert _blocks(blocks.find_substrings(l1, l2, compare, reverse,
+                                          signaled)) == expected
+
+@pytest.mark.parametrize('seed', range(10))
+@pytest.mark.parametrize('compare, reverse, signaled', [
+    (blocks.compare, False, False),
+    (blocks.compare, True, False),
+    (blocks.signaled_compare, True, True)])
+def test_parallel_blocks(seed, compare, reverse, signaled):
+    l1, l2, _, _ = _instance(seed, signaled, False)
+    assert find_blocks_par(l1, l2, compare, reverse, signaled, workers=2,
+                           shards=3) == \
+           blocks.find_substrings(l1, l2, compare, reverse, signaled)
@@ -0,0 +1,33 @@
+import pytest
+
+from src.ilp import Block_ILP, Substring_ILP
+from src.utils import inter
+from src.utils.cache import ModelCache
+
+L1 = [1, -2, 3, 4, -5, 2, 3]
+L2 = [-3, 2, 1, 4, -5, -3, -2]
+
+def _solve(impl, cache, **kwargs):
+    ilp = impl(L1, L2, inter.signaled_compare, False, True, True, False,
+               backend='highs', model_cache=cache, **kwargs)
+    ilp.run()
+    return ilp
+
+@pytest.mark.parametrize('options', [{}, {'presolve': True},
+                                     {'bound': 'stop'}])
+@pytest.mark.parametrize('impl', (Block_ILP, Substring_ILP))
+def test_hit_skips_enumeration(impl, options, tmp_path, monkeypatch):
+    cache = ModelCache(str(tmp_path))
+    miss = _solve(impl, cache, **options)
+    assert miss.stats['model_cache'] == 'miss' and miss.sol
+
+    calls = []
+    enumerate_ = impl._enumerate
+    monkeypatch.setattr(impl, '_enumerate',
+                        lambda self: calls.append(1) or enumerate_(self))
+    hit = _solve(impl, cache, **options)
+    assert hit.stats['model_cache'] == 'hit'
+    # only the bound needs the blocks besides the cached model
+    assert len(calls) == (options.get('bound') is not None)
+    assert hit.result['last_sol'] == miss.result['last_sol']
+    assert sorted(hit.sol) == sorted(miss.sol)
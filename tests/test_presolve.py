@@ -0,0 +1,80 @@
+import random
+import sys
+
+import numpy as np
+import pytest
+
+from src.ilp import Block_ILP, Substring_ILP
+from src.ilp.backends import HighsBackend
+from src.ilp.presolve import presolve, stack_rows
+from src.ilp.watcher import Watcher
+from src.utils import inter
+
+IMPLS = (Block_ILP, Substring_ILP)
+
+def _pair(seed):
+    # a signed string and a shuffled copy with some characters flipped
+    rng = random.Random(seed)
+    l1 = [rng.choice((1, -1)) * rng.randint(1, 3)
+          for _ in range(rng.randint(4, 12))]
+    l2 = [rng.choice((1, -1)) * x for x in l1]
+    rng.shuffle(l2)
+    return l1, l2
+
+def _solve(impl, l1, l2, i1=None, i2=None, **kwargs):
+    ilp = impl(l1, l2, inter.signaled_compare, False, True, True, False,
+               i1 is not None, i1, i2, backend='highs', **kwargs)
+    ilp.run()
+    return ilp
+
+@pytest.mark.parametrize('seed', range(10))
+@pytest.mark.parametrize('impl', IMPLS)
+def test_same_optimum(seed, impl):
+    l1, l2 = _pair(seed)
+    full = _solve(impl, l1, l2)
+    reduced = _solve(impl, l1, l2, presolve=True)
+    assert reduced.result['last_sol'] == full.result['last_sol']
+
+def test_stack_rows_empty():
+    model = HighsBackend('empty', 1)
+    model.add_vars(np.ones(3))
+    A, sense, rhs = stack_rows(model)
+    assert A.shape == (0, 3) and not len(sense) and not len(rhs)
+
+# instances where presolve fixes every column, so no solver is called
+FIXED = [(Block_ILP, [1, 2, 3], [3, 2, 1], None, None, 3),
+         (Substring_ILP, [1, 2, 3], [3, 2, 1], None, None, 3),
+         (Substring_ILP, [-1, 1], [-1, -1], [0], [0], 2)]
+
+@pytest.mark.parametrize('options', [{}, {'cliques': 'root'},
+                                     {'bound': 'only'}, {'decompose': True},
+                                     {'warm_start': True}])
+@pytest.mark.parametrize('impl, l1, l2, i1, i2, opt', FIXED)
+def test_fixes_every_column(impl, l1, l2, i1, i2, opt, options):
+    ilp = _solve(impl, l1, l2, i1, i2, presolve=True, **options)
+    assert ilp.model.num_vars == 0
+    assert ilp.result['best_bd'] == opt
+    if options.get('bound') != 'only':
+        assert ilp.result['last_sol'] == opt
+        assert ilp.result['gap'] == 0
+        assert len(ilp.sol) == opt
+
+@pytest.mark.parametrize('impl, l1, l2, i1, i2, opt', FIXED)
+def test_fixes_every_column_scipy(impl, l1, l2, i1, i2, opt, monkeypatch):
+    # HighsBackend falls back to scipy's milp without highspy
+    monkeypatch.setitem(sys.modules, 'highspy', None)
+    ilp = _solve(impl, l1, l2, i1, i2, presolve=True)
+    assert ilp.result['last_sol'] == opt and len(ilp.sol) == opt
+
+def test_empty_model_infeasible():
+    # a row violated by the fixings stays, and the empty point violates it
+    model = HighsBackend('infeasible', 1)
+    model.add_vars(np.ones(1))
+    model.add_constrs(np.ones((2, 1)), '=', np.ones(2))
+    model.add_constrs(np.array([[0.]]), '=', np.ones(1))
+    presolve(model)
+    assert model.num_vars == 0 and model.rows
+    watcher = Watcher(float('inf'), lambda x, y: x < y)
+    model.optimize_empty(watcher)
+    assert model.X is None and not watcher.first_found
+    assert model.relaxation() is None
@@ -0,0 +1,15 @@
+import pytest
+
+from src.utils.scheduler import Scheduler
+
+@pytest.mark.parametrize('threads, options, cores', [
+    (1, {}, 1),
+    (4, {}, 4),
+    (2, {'workers': 6}, 6),
+    (2, {'workers': 3, 'decompose': True}, 6),
+    (2, {'decompose': True}, 2),
+    (4, {'workers': 4, 'decompose': True}, 8)])
+def test_cores(threads, options, cores):
+    scheduler = Scheduler(8, threads)
+    scheduler.add('x.log', None, [1], [1], **options)
+    assert scheduler._cores(scheduler.jobs[0][4]) == cores